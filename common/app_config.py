@@ -36,6 +36,51 @@ class Config(BaseConfig):
     POSTGRES_PASSWORD: str = Field(env='POSTGRES_PASSWORD')
     POSTGRES_DB: str = Field(env='POSTGRES_DB')
 
+    # Standalone connection pool, used outside of a Flask app context
+    POSTGRES_POOL_SIZE: int = Field(env='POSTGRES_POOL_SIZE', default=10)
+    POSTGRES_POOL_TIMEOUT: int = Field(env='POSTGRES_POOL_TIMEOUT', default=30)
+    POSTGRES_POOL_MAX_IDLE: int = Field(env='POSTGRES_POOL_MAX_IDLE', default=300)
+    POSTGRES_POOL_MAX_LIFETIME: int = Field(env='POSTGRES_POOL_MAX_LIFETIME', default=3600)
+
+    # Comma-separated `host` or `host:port` list of read replicas, which share the primary's credentials
+    POSTGRES_REPLICA_HOSTS: str = Field(env='POSTGRES_REPLICA_HOSTS', default='')
+
+    # Per-person todo list cache: number of lists kept, seconds they are kept for, and size of the largest
+    # list that is cached
+    TODO_CACHE_MAX_SIZE: int = Field(env='TODO_CACHE_MAX_SIZE', default=10000)
+    TODO_CACHE_TTL: int = Field(env='TODO_CACHE_TTL', default=60)
+    TODO_CACHE_MAX_LIST_SIZE: int = Field(env='TODO_CACHE_MAX_LIST_SIZE', default=1000)
+
+    # Per-person cache of the person and email of access tokens: number of people kept, and seconds they
+    # are kept for
+    IDENTITY_CACHE_MAX_SIZE: int = Field(env='IDENTITY_CACHE_MAX_SIZE', default=10000)
+    IDENTITY_CACHE_TTL: int = Field(env='IDENTITY_CACHE_TTL', default=60)
+
+    # Seconds between two log lines of the counters and hit rates of the in-process caches, written by every
+    # worker as it serves requests. 0 disables them.
+    CACHE_STATS_LOG_INTERVAL: int = Field(env='CACHE_STATS_LOG_INTERVAL', default=300)
+
+    # Seconds a todo change waits before GET /todo/changes returns it, covering writes still in flight. Todo
+    # writes are stamped from the database clock once they hold their locks, so this only has to exceed the
+    # time from the stamp to the commit of a write, i.e. the statements of one move, reorder or rebalance.
+    TODO_CHANGES_DELAY: float = Field(env='TODO_CHANGES_DELAY', default=2)
+
+    # How saves write the previous version of a row to its audit table: `sync` in the same transaction, as
+    # rococo does, `durable` in the same statement as the save, or `async` through a background writer
+    # after the save has committed. `async` is best effort: audit rows still queued on a crash are lost.
+    # The writer's queue holds up to AUDIT_QUEUE_SIZE saves; when it is full, a save waits
+    # AUDIT_QUEUE_TIMEOUT seconds and then writes its audit row itself.
+    AUDIT_WRITE_MODE: str = Field(env='AUDIT_WRITE_MODE', default='sync')
+    AUDIT_QUEUE_SIZE: int = Field(env='AUDIT_QUEUE_SIZE', default=10000)
+    AUDIT_BATCH_SIZE: int = Field(env='AUDIT_BATCH_SIZE', default=500)
+    AUDIT_FLUSH_INTERVAL: float = Field(env='AUDIT_FLUSH_INTERVAL', default=0.05)
+    AUDIT_QUEUE_TIMEOUT: float = Field(env='AUDIT_QUEUE_TIMEOUT', default=1)
+
+    # Audit maintenance (common/tasks/audit_maintenance.py): monthly partitions created ahead of time, and
+    # days the versions are kept for, 0 keeping them forever
+    AUDIT_PARTITIONS_AHEAD: int = Field(env='AUDIT_PARTITIONS_AHEAD', default=3)
+    AUDIT_RETENTION_DAYS: int = Field(env='AUDIT_RETENTION_DAYS', default=0)
+
     RABBITMQ_HOST: str = Field(env='RABBITMQ_HOST')
     RABBITMQ_PORT: int = Field(env='RABBITMQ_PORT')
     RABBITMQ_VIRTUAL_HOST: str = Field(env='RABBITMQ_VIRTUAL_HOST', default='/')
@@ -1,6 +1,6 @@
-from .person import PersonRepository
-from .email import EmailRepository
+from .person import PersonRepository, AsyncPersonRepository
+from .email import EmailRepository, AsyncEmailRepository
 from .organization import OrganizationRepository
 from .login_method import LoginMethodRepository
 from .person_organization_role import PersonOrganizationRoleRepository
-from .todo import TodoListRepository
\ No newline at end of file
+from .todo import TodoListRepository, AsyncTodoListRepository
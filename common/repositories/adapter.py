@@ -0,0 +1,120 @@
+import json
+import threading
+from contextlib import contextmanager
+from uuid import uuid4
+
+from rococo.data.postgresql import PostgreSQLAdapter
+
+
+class ThreadSafePostgreSQLAdapter(PostgreSQLAdapter):
+    """
+    PostgreSQLAdapter that keeps its connection and cursor per thread, so a single instance
+    can be shared by every repository in the process.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._local = threading.local()
+        super().__init__(*args, **kwargs)
+
+    @property
+    def _connection(self):
+        return getattr(self._local, 'connection', None)
+
+    @_connection.setter
+    def _connection(self, connection):
+        self._local.connection = connection
+
+    @property
+    def _cursor(self):
+        return getattr(self._local, 'cursor', None)
+
+    @_cursor.setter
+    def _cursor(self, cursor):
+        self._local.cursor = cursor
+
+    @property
+    def _in_transaction(self):
+        return getattr(self._local, 'in_transaction', False)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs every query of the block in a single transaction, committed when the block exits and rolled back
+        when it raises, e.g. to read rows and write based on them under a lock. Use it inside `with adapter`,
+        writing through `run_transaction` or `execute_returning_query`.
+        """
+        self._local.in_transaction = True
+        try:
+            yield
+            self._connection.commit()
+        except Exception:
+            self._connection.rollback()
+            raise
+        finally:
+            self._local.in_transaction = False
+
+    def _commit(self):
+        if not self._in_transaction:
+            self._connection.commit()
+
+    def _rollback(self):
+        if not self._in_transaction:
+            self._connection.rollback()
+
+    def run_transaction(self, queries_list):
+        """
+        Executes a list of queries in a single transaction against the database, rolling it back on failure.
+        Returns the row count of every query.
+        """
+        row_counts = []
+        try:
+            for query in queries_list:
+                if type(query) is tuple:
+                    query, values = query
+                else:
+                    values = ()
+                self._cursor.execute(query, self._transform_values(values))
+                row_counts.append(self._cursor.rowcount)
+            self._commit()
+        except Exception:
+            self._rollback()
+            raise
+        return row_counts
+
+    def execute_returning_query(self, sql, _vars=None):
+        """
+        Executes a query and commits it, rolling it back on failure. Unlike `execute_query`, the rows it
+        returns are fetched whatever the statement, e.g. for `INSERT ... RETURNING` or a data-modifying CTE.
+        """
+        try:
+            self._cursor.execute(sql, self._transform_values(_vars or ()))
+            rows = []
+            if self._cursor.description is not None:
+                column_names = [desc[0] for desc in self._cursor.description]
+                rows = [dict(zip(column_names, row)) for row in self._cursor.fetchall()]
+            self._commit()
+        except Exception:
+            self._rollback()
+            raise
+        return rows
+
+    def iter_query(self, sql, _vars=None, batch_size: int = 1000):
+        """
+        Executes a query with a server-side cursor and yields its rows one at a time, fetching them from the
+        database in batches of `batch_size`. The adapter must stay open until the iteration is over.
+        """
+        cursor = self._connection.cursor(name=f"iter_{uuid4().hex}")
+        cursor.itersize = batch_size
+        try:
+            cursor.execute(sql, _vars)
+            column_names = None
+            for row in cursor:
+                if column_names is None:
+                    column_names = [desc[0] for desc in cursor.description]
+                yield dict(zip(column_names, row))
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _transform_values(values):
+        return [json.dumps(value) if isinstance(value, dict) else value for value in values]
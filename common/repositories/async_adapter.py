@@ -0,0 +1,201 @@
+import asyncio
+import contextvars
+import json
+import random
+from contextlib import AsyncExitStack, asynccontextmanager
+from uuid import uuid4
+from typing import Any, Dict, List, Optional, Tuple
+
+from rococo.data.postgresql import PostgreSQLAdapter
+
+from common.app_logger import logger
+from common.repositories.routing import should_use_replica
+
+
+class AsyncPostgreSQLAdapter:
+    """
+    Async counterpart of rococo's PostgreSQLAdapter, backed by psycopg 3 async connection pools.
+
+    It builds the same SQL as the sync adapter, so both can be used against the same tables. Connections
+    are routed like the ones of the sync adapters: read-only ones (see `common.repositories.routing`) are
+    served by a random replica, falling back to the primary when it is unavailable. Every query runs in
+    an explicit transaction. The pools are opened on first use and are bound to the event loop that
+    opened them.
+    """
+
+    # Query builders shared with the sync adapter; none of them touch the connection.
+    _build_condition_string = PostgreSQLAdapter._build_condition_string
+    get_save_query = PostgreSQLAdapter.get_save_query
+    get_move_entity_to_audit_table_query = PostgreSQLAdapter.get_move_entity_to_audit_table_query
+
+    def __init__(
+            self, host: str, port: int, user: str, password: str, database: str, min_size: int = 1,
+            max_size: int = 10, timeout: float = 30, max_idle: float = 300, max_lifetime: float = 3600,
+            replicas: Tuple[dict, ...] = ()
+    ):
+        self._connect_kwargs = dict(host=host, port=port, user=user, password=password, dbname=database)
+        self._pool_settings = dict(
+            min_size=min_size, max_size=max_size, timeout=timeout, max_idle=max_idle, max_lifetime=max_lifetime
+        )
+        self._replicas = tuple(replicas)
+        self._pools = {}
+        self._pool_lock = asyncio.Lock()
+        # Connection of the `transaction` block the current task runs in
+        self._transaction_connection = contextvars.ContextVar(f"transaction_connection_{id(self)}", default=None)
+
+    async def _get_pool(self, replica: dict = None):
+        key = (replica['host'], replica['port']) if replica else None
+        pool = self._pools.get(key)
+        if pool is None:
+            async with self._pool_lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    from psycopg.rows import dict_row
+                    from psycopg_pool import AsyncConnectionPool
+
+                    pool = AsyncConnectionPool(
+                        kwargs=dict(self._connect_kwargs, **(replica or {}), row_factory=dict_row),
+                        check=AsyncConnectionPool.check_connection,
+                        open=False,
+                        **self._pool_settings
+                    )
+                    await pool.open()
+                    self._pools[key] = pool
+        return pool
+
+    async def close(self):
+        pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            await pool.close()
+
+    @asynccontextmanager
+    async def connection(self, replica: bool = None):
+        """
+        Yields a pooled connection inside a transaction, which is committed when the block exits and rolled
+        back when it raises. `replica` defaults to the routing of the current context. Inside a `transaction`
+        block, yields the connection of the block instead.
+        """
+        from psycopg import OperationalError
+        from psycopg_pool import PoolTimeout
+
+        transaction_connection = self._transaction_connection.get()
+        if transaction_connection is not None:
+            # Queries of a `transaction` block run in its transaction
+            yield transaction_connection
+            return
+
+        if replica is None:
+            replica = should_use_replica()
+
+        async with AsyncExitStack() as stack:
+            connection = None
+            if replica and self._replicas:
+                target = random.choice(self._replicas)
+                try:
+                    connection = await stack.enter_async_context((await self._get_pool(target)).connection())
+                except (OperationalError, PoolTimeout) as e:
+                    logger.warning(f"Read replica {target['host']}:{target['port']} is unavailable, using primary: {e}")
+            if connection is None:
+                connection = await stack.enter_async_context((await self._get_pool()).connection())
+
+            async with connection.transaction():
+                yield connection
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Runs every query of the block on the same primary connection, in a single transaction committed when
+        the block exits and rolled back when it raises, e.g. to read rows and write based on them under a lock.
+        """
+        async with self.connection(replica=False) as connection:
+            token = self._transaction_connection.set(connection)
+            try:
+                yield
+            finally:
+                self._transaction_connection.reset(token)
+
+    @staticmethod
+    def _transform_values(values):
+        return [json.dumps(value) if isinstance(value, dict) else value for value in values]
+
+    async def execute_query(self, sql: str, _vars=None) -> Optional[List[Dict[str, Any]]]:
+        """Executes a query. Returns the rows of queries that produce any, otherwise None."""
+        async with self.connection() as connection:
+            cursor = await connection.execute(sql, _vars)
+            if cursor.description is None:
+                return None
+            return await cursor.fetchall()
+
+    async def execute_returning_query(self, sql: str, _vars=None) -> List[Dict[str, Any]]:
+        """
+        Executes a query on the primary and commits it, rolling it back on failure. Returns the rows it
+        produces, e.g. for `INSERT ... RETURNING` or a data-modifying CTE.
+        """
+        async with self.connection(replica=False) as connection:
+            cursor = await connection.execute(sql, self._transform_values(_vars or ()))
+            if cursor.description is None:
+                return []
+            return await cursor.fetchall()
+
+    async def iter_query(self, sql: str, _vars=None, batch_size: int = 1000, replica: bool = None):
+        """Executes a query with a server-side cursor and yields its rows one at a time, fetching them from the
+        database in batches of `batch_size`. `replica` is passed to `connection`."""
+        async with self.connection(replica) as connection:
+            async with connection.cursor(name=f"iter_{uuid4().hex}") as cursor:
+                cursor.itersize = batch_size
+                await cursor.execute(sql, _vars)
+                async for row in cursor:
+                    yield row
+
+    async def run_transaction(self, queries_list):
+        """
+        Executes a list of queries in a single transaction against the primary.
+        Returns the row count of every query.
+        """
+        row_counts = []
+        async with self.connection(replica=False) as connection:
+            for query in queries_list:
+                if type(query) is tuple:
+                    query, values = query
+                else:
+                    values = ()
+                cursor = await connection.execute(query, self._transform_values(values))
+                row_counts.append(cursor.rowcount)
+        return row_counts
+
+    def _get_select_query(
+            self, table: str, conditions: Dict[str, Any] = None, sort: List[Tuple[str, str]] = None,
+            limit: int = None, offset: int = None, active: bool = True
+    ):
+        condition_strs_values = []
+        if conditions:
+            condition_strs_values = [self._build_condition_string(table, k, v) for k, v in conditions.items()]
+        if active:
+            condition_strs_values.append((f"{table}.active = %s", [True]))
+
+        query = f"SELECT {table}.* FROM {table}"
+        if condition_strs_values:
+            query += f" WHERE {' AND '.join(condition_str for condition_str, _ in condition_strs_values)}"
+        if sort:
+            query += f" ORDER BY {', '.join(f'{column} {direction}' for column, direction in sort)}"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        if offset is not None:
+            query += f" OFFSET {int(offset)}"
+
+        values = sum((condition_values for _, condition_values in condition_strs_values), [])
+        return query, tuple(values)
+
+    async def get_one(
+            self, table: str, conditions: Dict[str, Any], sort: List[Tuple[str, str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        query, values = self._get_select_query(table, conditions, sort, limit=1)
+        rows = await self.execute_query(query, values)
+        return rows[0] if rows else None
+
+    async def get_many(
+            self, table: str, conditions: Dict[str, Any] = None, sort: List[Tuple[str, str]] = None,
+            limit: int = None, offset: int = None, active: bool = True
+    ) -> List[Dict[str, Any]]:
+        query, values = self._get_select_query(table, conditions, sort, limit, offset, active)
+        return await self.execute_query(query, values) or []
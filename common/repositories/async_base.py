@@ -0,0 +1,87 @@
+import re
+from dataclasses import fields
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from rococo.models import VersionedModel
+from rococo.repositories.postgresql.postgresql_repository import adjust_conditions
+
+from common.repositories.base import VersionedQueriesMixin
+from common.repositories.routing import read_only, mark_primary_write
+
+
+class AsyncBaseRepository(VersionedQueriesMixin):
+    """
+    Async counterpart of BaseRepository. It keeps the same table naming, versioning and audit semantics:
+    every save moves the current row to the `<table>_audit` table in the same transaction.
+    """
+
+    MODEL = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.MODEL is None:
+            raise TypeError(f"Subclasses of {cls.__name__} must define the MODEL attribute.")
+
+    def __init__(self, db_adapter, user_id: str = None):
+        self.adapter = db_adapter
+        self.model = self.MODEL
+        self.user_id = user_id
+        self.table_name = re.sub(r'(?<!^)(?=[A-Z])', '_', self.MODEL.__name__).lower()
+
+    def _process_data_before_save(self, instance: VersionedModel) -> Dict[str, Any]:
+        """Same conversion as PostgreSQLRepository._process_data_before_save."""
+        instance.prepare_for_save(changed_by_id=self.user_id)
+        data = instance.as_dict(convert_datetime_to_iso_string=False, convert_uuids=False)
+        for field in fields(instance):
+            field_value = data.get(field.name)
+            if field_value is None:
+                continue
+
+            if field.metadata.get('field_type') in ['entity_id', 'uuid']:
+                if isinstance(field_value, VersionedModel):
+                    field_value = str(field_value.entity_id).replace('-', '')
+                elif isinstance(field_value, dict):
+                    field_value = str(field_value.get('entity_id')).replace('-', '')
+                elif isinstance(field_value, str):
+                    field_value = field_value.replace('-', '')
+
+            if isinstance(field_value, UUID):
+                field_value = str(field_value).replace('-', '')
+            if isinstance(field_value, datetime):
+                field_value = field_value.strftime('%Y-%m-%d %H:%M:%S')
+
+            data[field.name] = field_value
+        return data
+
+    async def get_one(self, conditions: Dict[str, Any] = None) -> Optional[VersionedModel]:
+        if conditions is not None:
+            conditions = adjust_conditions(conditions)
+        with read_only():
+            data = await self.adapter.get_one(self.table_name, conditions)
+        if not data:
+            return None
+        return self.model.from_dict(data)
+
+    async def get_many(
+            self, conditions: Dict[str, Any] = None, sort: List[tuple] = None, limit: int = None,
+            offset: int = None
+    ) -> List[VersionedModel]:
+        if conditions is not None:
+            conditions = adjust_conditions(conditions)
+        with read_only():
+            records = await self.adapter.get_many(self.table_name, conditions, sort, limit, offset)
+        return [self.model.from_dict(record) for record in records]
+
+    async def save(self, instance: VersionedModel) -> VersionedModel:
+        mark_primary_write()
+        data = self._process_data_before_save(instance)
+        move_entity_query = self.adapter.get_move_entity_to_audit_table_query(self.table_name, instance.entity_id)
+        save_entity_query = self.adapter.get_save_query(self.table_name, data)
+        await self.adapter.run_transaction([move_entity_query, save_entity_query])
+        return instance
+
+    async def delete(self, instance: VersionedModel) -> VersionedModel:
+        instance.active = False
+        return await self.save(instance)
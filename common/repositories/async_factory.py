@@ -0,0 +1,69 @@
+import threading
+
+from common.repositories import AsyncPersonRepository, AsyncEmailRepository, AsyncTodoListRepository
+from common.repositories.async_adapter import AsyncPostgreSQLAdapter
+from common.repositories.factory import RepoType, get_replicas
+
+
+class AsyncRepositoryFactory:
+    """
+    Async counterpart of RepositoryFactory. One AsyncPostgreSQLAdapter, and so one async pool, is shared
+    per configuration. The pool belongs to the event loop that first uses it, so a process should run the
+    async layer on a single loop and call `AsyncRepositoryFactory.close()` when that loop shuts down.
+    """
+
+    _cache_lock = threading.Lock()
+    _adapter_cache = {}
+
+    def __init__(self, config):
+        self.config = config
+
+    _repositories = {
+        RepoType.PERSON: AsyncPersonRepository,
+        RepoType.EMAIL: AsyncEmailRepository,
+        RepoType.TODO: AsyncTodoListRepository
+    }
+
+    @classmethod
+    async def close(cls):
+        with cls._cache_lock:
+            adapters = list(cls._adapter_cache.values())
+            cls._adapter_cache.clear()
+        for adapter in adapters:
+            await adapter.close()
+
+    def _get_db_cache_key(self):
+        return (
+            self.config.POSTGRES_HOST, int(self.config.POSTGRES_PORT), self.config.POSTGRES_USER,
+            self.config.POSTGRES_PASSWORD, self.config.POSTGRES_DB, self.config.POSTGRES_REPLICA_HOSTS
+        )
+
+    def get_db_connection(self) -> AsyncPostgreSQLAdapter:
+        key = self._get_db_cache_key()
+        adapter = self._adapter_cache.get(key)
+        if adapter is None:
+            with self._cache_lock:
+                adapter = self._adapter_cache.get(key)
+                if adapter is None:
+                    adapter = AsyncPostgreSQLAdapter(
+                        self.config.POSTGRES_HOST,
+                        int(self.config.POSTGRES_PORT),
+                        self.config.POSTGRES_USER,
+                        self.config.POSTGRES_PASSWORD,
+                        self.config.POSTGRES_DB,
+                        max_size=int(self.config.POSTGRES_POOL_SIZE),
+                        timeout=self.config.POSTGRES_POOL_TIMEOUT,
+                        max_idle=self.config.POSTGRES_POOL_MAX_IDLE,
+                        max_lifetime=self.config.POSTGRES_POOL_MAX_LIFETIME,
+                        replicas=get_replicas(self.config)
+                    )
+                    self._adapter_cache[key] = adapter
+        return adapter
+
+    def get_repository(self, repo_type: RepoType, person_id=None):
+        repo_class = self._repositories.get(repo_type)
+
+        if repo_class:
+            return repo_class(self.get_db_connection(), person_id)
+
+        raise ValueError(f"No async repository found with the name '{repo_type}'")
@@ -0,0 +1,136 @@
+import atexit
+import queue
+import threading
+import time
+import weakref
+from enum import Enum
+from typing import Any, Dict, List
+
+from common.app_logger import logger
+
+
+class AuditMode(str, Enum):
+    # The audit row is written in the transaction of the save, as rococo does
+    SYNC = "sync"
+    # The audit row is written by the statement of the save, in its transaction, in a single round trip
+    DURABLE = "durable"
+    # Best effort: the audit row is queued and written by a background worker once the save has committed;
+    # rows still queued are lost on a crash
+    ASYNC = "async"
+
+
+class _AuditBatch:
+    """Audit rows queued together by one save."""
+
+    __slots__ = ('table', 'rows')
+
+    def __init__(self, table: str, rows: List[Dict[str, Any]]):
+        self.table = table
+        self.rows = rows
+
+
+_writers = weakref.WeakSet()
+
+
+class AuditWriter:
+    """
+    Writes audit rows out of the request path, in the async mode. Saves hand their previous versions to
+    `write` once they have committed, and a background thread writes them with one multi-row insert per
+    audit table and batch. This is best effort: rows still queued when the process dies are lost.
+
+    The queue is bounded: when it is full, `write` blocks for up to `put_timeout` seconds and then writes
+    the rows itself, so a slow database slows callers down instead of growing the queue. Queued rows are
+    flushed when the process exits.
+    """
+
+    def __init__(
+            self, adapter, max_queue_size: int = 10000, batch_size: int = 500, flush_interval: float = 0.05,
+            put_timeout: float = 1
+    ):
+        self.adapter = adapter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._worker = None
+        _writers.add(self)
+
+    def write(self, table: str, rows: List[Dict[str, Any]]):
+        """Queues the rows of the audit table `table`."""
+        if not rows:
+            return
+
+        batch = _AuditBatch(table, rows)
+        self._ensure_worker()
+        try:
+            self._queue.put(batch, timeout=self.put_timeout)
+        except queue.Full:
+            logger.warning(f"Audit queue is full, writing {len(rows)} {table} rows inline")
+            self._write_batches([batch])
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits until every queued row has been written. Returns False when `timeout` expired first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            batches = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            row_count = len(batches[0].rows)
+            while row_count < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batches.append(batch)
+                row_count += len(batch.rows)
+
+            try:
+                self._write_batches(batches)
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+
+    def _write_batches(self, batches: List[_AuditBatch]):
+        rows_by_table = {}
+        for batch in batches:
+            rows_by_table.setdefault(batch.table, []).extend(batch.rows)
+
+        try:
+            with self.adapter:
+                self.adapter.run_transaction([
+                    self._get_insert_query(table, rows) for table, rows in rows_by_table.items()
+                ])
+        except Exception:
+            logger.exception(f"Failed to write audit rows of {', '.join(rows_by_table)}")
+
+    @staticmethod
+    def _get_insert_query(table: str, rows: List[Dict[str, Any]]):
+        columns = list(rows[0])
+        values = ", ".join([f"({', '.join(['%s'] * len(columns))})"] * len(rows))
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {values} ON CONFLICT DO NOTHING"
+        return query, tuple(row[column] for row in rows for column in columns)
+
+
+@atexit.register
+def flush_audit_writers(timeout: float = 10):
+    """Writes the rows still queued by every audit writer, e.g. before the process exits."""
+    for writer in list(_writers):
+        if not writer.flush(timeout):
+            logger.error("Audit rows were still queued at shutdown and have been lost")
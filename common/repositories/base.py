@@ -1,10 +1,97 @@
+import json
+
 from rococo.repositories.postgresql import PostgreSQLRepository
 from rococo.data.postgresql import PostgreSQLAdapter
 from rococo.messaging.base import MessageAdapter
-from typing import Optional
+from rococo.models import VersionedModel
+from typing import Any, Dict, List, Optional
+
+from common.repositories.audit import AuditMode, AuditWriter
+from common.repositories.routing import read_only, mark_primary_write
+
+
+class VersionedQueriesMixin:
+    """
+    SQL builders for set-based writes that keep the semantics of `save`: the current version of every
+    affected row is copied to the audit table and the row gets a new version, in a single statement.
+    """
+
+    NEW_VERSION_SQL = "replace(gen_random_uuid()::text, '-', '')"
+    NOW_SQL = "(now() AT TIME ZONE 'utc')"
+    # Time the row is written at, from the database clock. Unlike now(), the start of the transaction, it
+    # leaves out the time the transaction waited for locks before writing.
+    CLOCK_SQL = "(clock_timestamp() AT TIME ZONE 'utc')"
+
+    def _get_bulk_insert_query(self, rows: List[Dict[str, Any]], column_sql: Dict[str, str] = None):
+        """
+        Returns a single query inserting every row, as processed by `_process_data_before_save`. `column_sql`
+        maps columns to SQL expressions inserted instead of the values of the rows.
+        """
+        column_sql = column_sql or {}
+        columns = list(rows[0])
+        placeholders = ", ".join(column_sql.get(column, "%s") for column in columns)
+        values = ", ".join([f"({placeholders})"] * len(rows))
+        query = f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES {values}"
+        return query, tuple(row[column] for row in rows for column in columns if column not in column_sql)
+
+    def _get_bulk_save_query(self, rows: List[Dict[str, Any]]):
+        """Returns a single query inserting new rows and overwriting the existing ones."""
+        query, params = self._get_bulk_insert_query(rows)
+        assignments = ", ".join(f"{column} = EXCLUDED.{column}" for column in rows[0] if column != 'entity_id')
+        return f"{query} ON CONFLICT (entity_id) DO UPDATE SET {assignments}", params
+
+    def _get_bulk_move_to_audit_query(self, entity_ids: List[str]):
+        """Returns a single query copying the current version of every given entity to the audit table."""
+        query = f"INSERT INTO {self.table_name}_audit SELECT * FROM {self.table_name} WHERE entity_id = ANY(%s)"
+        return query, (list(entity_ids),)
+
+    def _get_save_returning_previous_query(self, data: Dict[str, Any], audit: bool = False):
+        """
+        Returns a single query saving a row, as processed by `_process_data_before_save`, that returns the
+        version it replaced. With `audit`, that version is also copied to the audit table by the same
+        statement; otherwise writing it is left to the caller.
+        """
+        table = self.table_name
+        query, params = self._get_bulk_save_query([data])
+        query = (
+            f"WITH old AS (SELECT * FROM {table} WHERE entity_id = %s FOR UPDATE), "
+            f"{f'audit AS (INSERT INTO {table}_audit SELECT * FROM old), ' if audit else ''}"
+            f"saved AS ({query}) "
+            f"SELECT * FROM old"
+        )
+        return query, (data['entity_id'],) + params
+
+    def _get_versioned_update_query(
+            self, assignments: str, where: str, where_params: tuple = (), assignment_params: tuple = (),
+            changed_by_id: str = None, returning: str = None, source: str = None, source_params: tuple = ()
+    ):
+        """
+        Returns a query updating every row matching `where` with `assignments`.
+
+        Column references in `assignments` must be qualified with the table name, as the matching rows
+        are also exposed as `old`. `source` is an optional aliased relation with an `entity_id` column,
+        joined to the matching rows to provide per-row values.
+        """
+        table = self.table_name
+        query = (
+            f"WITH old AS (SELECT * FROM {table} WHERE {where} FOR UPDATE), "
+            f"audit AS (INSERT INTO {table}_audit SELECT * FROM old) "
+            f"UPDATE {table} SET {assignments}, "
+            f"previous_version = {table}.version, "
+            f"version = {self.NEW_VERSION_SQL}, "
+            f"changed_on = {self.CLOCK_SQL}, "
+            f"changed_by_id = COALESCE(%s, {table}.changed_by_id) "
+            f"FROM old{f' JOIN {source} USING (entity_id)' if source else ''} "
+            f"WHERE {table}.entity_id = old.entity_id"
+        )
+        if returning:
+            query += f" RETURNING {returning}"
+
+        changed_by_id = changed_by_id if changed_by_id is not None else self.user_id
+        return query, tuple(where_params) + tuple(assignment_params) + (changed_by_id,) + tuple(source_params)
 
 
-class BaseRepository(PostgreSQLRepository):
+class BaseRepository(VersionedQueriesMixin, PostgreSQLRepository):
     MODEL = None
 
     def __init_subclass__(cls, **kwargs):
@@ -14,7 +101,43 @@ class BaseRepository(PostgreSQLRepository):
 
     def __init__(
             self, db_adapter: PostgreSQLAdapter, message_adapter: Optional[MessageAdapter], 
-            queue_name: str, user_id: str = None
+            queue_name: str, user_id: str = None, audit_mode: AuditMode = AuditMode.SYNC,
+            audit_writer: Optional[AuditWriter] = None
     ):
         # Pass MODEL as the model to the BaseRepository
         super().__init__(db_adapter, self.MODEL, message_adapter, queue_name, user_id=user_id)
+        self.audit_mode = AuditMode(audit_mode)
+        self.audit_writer = audit_writer
+
+    def get_one(self, conditions: Dict[str, Any] = None, fetch_related: List[str] = None):
+        with read_only():
+            return super().get_one(conditions, fetch_related=fetch_related)
+
+    def get_many(
+            self, conditions: Dict[str, Any] = None, sort: List[tuple] = None, limit: int = None,
+            offset: int = None, fetch_related: List[str] = None
+    ):
+        with read_only():
+            return super().get_many(conditions, sort, limit, offset, fetch_related)
+
+    def save(self, instance: VersionedModel, send_message: bool = False):
+        mark_primary_write()
+        durable = self.audit_mode == AuditMode.DURABLE
+        if not durable and self.audit_writer is None:
+            return super().save(instance, send_message)
+
+        # In durable mode the previous version is copied to the audit table by the statement of the save;
+        # in async mode it is handed to the audit writer once the save has committed
+        data = self._process_data_before_save(instance)
+        with self.adapter:
+            previous_rows = self.adapter.execute_returning_query(
+                *self._get_save_returning_previous_query(data, audit=durable)
+            )
+        if not durable:
+            self.audit_writer.write(f"{self.table_name}_audit", previous_rows)
+
+        if send_message:
+            message = json.dumps(instance.as_dict(convert_datetime_to_iso_string=True))
+            self.message_adapter.send_message(self.queue_name, message)
+
+        return instance
@@ -1,6 +1,11 @@
 from common.repositories.base import BaseRepository
+from common.repositories.async_base import AsyncBaseRepository
 from common.models.email import Email
 
 
 class EmailRepository(BaseRepository):
     MODEL = Email
+
+
+class AsyncEmailRepository(AsyncBaseRepository):
+    MODEL = Email
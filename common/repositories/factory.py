@@ -1,6 +1,16 @@
+import random
+import threading
+from functools import partial
+
+import psycopg2
+
 from common.repositories import *
+from common.repositories.adapter import ThreadSafePostgreSQLAdapter
+from common.repositories.audit import AuditMode, AuditWriter
+from common.repositories.messaging import LazyMessageAdapter
+from common.repositories.pool import get_connection_pool, release_connection, PoolTimeoutError
+from common.repositories.routing import should_use_replica
 from enum import Enum, auto
-from rococo.data.postgresql import PostgreSQLAdapter
 from rococo.messaging.rabbitmq import RabbitMqConnection
 from typing import Optional
 from common.app_logger import logger
@@ -38,16 +48,53 @@ class MessageAdapterType(str, Enum):
         return str(self.value)
 
 
-def get_connection_resolver():
-    pooled_db = get_flask_pooled_db()
-    if pooled_db:
-        return pooled_db.get_connection
+def resolve_connection(pool_settings=None, replicas=(), **kwargs):
+    """
+    Connection resolver for the shared adapters. It is evaluated on every connect, since a cached
+    adapter may be used both inside and outside of a Flask app context. Outside of Flask, connections
+    come from the standalone pool in `common.repositories.pool`.
 
+    Read-only connections are served by a random replica, unless the current request already wrote
+    to the primary. An unavailable replica falls back to the primary.
+    """
+    pool_settings = pool_settings or {}
+
+    if replicas and should_use_replica():
+        replica = random.choice(replicas)
+        try:
+            return get_connection_pool({**kwargs, **replica}, **pool_settings).connection()
+        except (psycopg2.OperationalError, PoolTimeoutError) as e:
+            logger.warning(f"Read replica {replica['host']}:{replica['port']} is unavailable, using primary: {e}")
 
-def get_connection_closer():
     pooled_db = get_flask_pooled_db()
     if pooled_db:
-        return lambda *args, **kwargs: None  # No-op; let Pooled DB handle closing of connection on request teardown.
+        return pooled_db.get_connection(**kwargs)
+    return get_connection_pool(kwargs, **pool_settings).connection()
+
+
+def get_replicas(config):
+    """Returns the `host` and `port` of every read replica listed in POSTGRES_REPLICA_HOSTS."""
+    replicas = []
+    for replica in filter(None, map(str.strip, config.POSTGRES_REPLICA_HOSTS.split(','))):
+        host, _, port = replica.partition(':')
+        replicas.append(dict(host=host, port=int(port or config.POSTGRES_PORT)))
+    return tuple(replicas)
+
+
+def close_connection(adapter):
+    if adapter._cursor is not None:
+        adapter._cursor.close()
+        adapter._cursor = None
+
+    connection, adapter._connection = adapter._connection, None
+    if connection is None or release_connection(connection):
+        return
+
+    if get_flask_pooled_db():
+        # Let Pooled DB handle closing of connection on request teardown.
+        return
+
+    connection.close()
 
 
 class RepoType(Enum):
@@ -66,6 +113,17 @@ class RepoType(Enum):
 
 
 class RepositoryFactory:
+    """
+    Builds repositories on top of process-wide adapters.
+
+    Adapters and repositories are cached per configuration, so building services on every
+    request does not rebuild them. Call `RepositoryFactory.clear_cache()` after a config reload.
+    """
+
+    _cache_lock = threading.RLock()
+    _adapter_cache = {}
+    _repository_cache = {}
+    _audit_writer_cache = {}
 
     def __init__(self, config):
         self.config = config
@@ -79,14 +137,91 @@ class RepositoryFactory:
         RepoType.TODO: TodoListRepository
     }
 
-    def get_db_connection(self):
+    @classmethod
+    def clear_cache(cls):
+        """
+        Drop every cached adapter and repository, e.g. after the config has been reloaded, along with the
+        shared services holding them.
+        """
+        # Imported here, since the services import this module
+        from common.services.container import ServiceContainer
+
+        with cls._cache_lock:
+            cls._adapter_cache.clear()
+            cls._repository_cache.clear()
+            # Audit writers are kept, so rows they still have queued are written
+        ServiceContainer.clear_all()
+
+    @classmethod
+    def _get_cached(cls, cache, key, builder):
+        instance = cache.get(key)
+        if instance is None:
+            with cls._cache_lock:
+                instance = cache.get(key)
+                if instance is None:
+                    instance = builder()
+                    cache[key] = instance
+        return instance
+
+    def _get_db_cache_key(self):
+        return (
+            'postgres', self.config.POSTGRES_HOST, int(self.config.POSTGRES_PORT), self.config.POSTGRES_USER,
+            self.config.POSTGRES_PASSWORD, self.config.POSTGRES_DB, self.config.POSTGRES_REPLICA_HOSTS
+        )
+
+    def _get_rabbitmq_cache_key(self):
+        return (
+            'rabbitmq', self.config.RABBITMQ_HOST, int(self.config.RABBITMQ_PORT), self.config.RABBITMQ_USER,
+            self.config.RABBITMQ_PASSWORD, self.config.RABBITMQ_VIRTUAL_HOST
+        )
+
+    def _get_pool_settings(self):
+        return dict(
+            max_size=int(self.config.POSTGRES_POOL_SIZE),
+            timeout=self.config.POSTGRES_POOL_TIMEOUT,
+            max_idle=self.config.POSTGRES_POOL_MAX_IDLE,
+            max_lifetime=self.config.POSTGRES_POOL_MAX_LIFETIME
+        )
+
+    def _get_replicas(self):
+        return get_replicas(self.config)
+
+    def _build_db_connection(self):
         host = self.config.POSTGRES_HOST
         port = int(self.config.POSTGRES_PORT)
         user = self.config.POSTGRES_USER
         password = self.config.POSTGRES_PASSWORD
         database = self.config.POSTGRES_DB
 
-        return PostgreSQLAdapter(host, port, user, password, database, connection_resolver=get_connection_resolver(), connection_closer=get_connection_closer())
+        return ThreadSafePostgreSQLAdapter(
+            host, port, user, password, database,
+            connection_resolver=partial(
+                resolve_connection, pool_settings=self._get_pool_settings(), replicas=self._get_replicas()
+            ),
+            connection_closer=close_connection
+        )
+
+    def get_db_connection(self):
+        return self._get_cached(self._adapter_cache, self._get_db_cache_key(), self._build_db_connection)
+
+    def get_audit_mode(self) -> AuditMode:
+        return AuditMode(self.config.AUDIT_WRITE_MODE)
+
+    def get_audit_writer(self) -> Optional[AuditWriter]:
+        """Returns the shared audit writer of the async mode, or None when audit rows are written by the saves."""
+        if self.get_audit_mode() != AuditMode.ASYNC:
+            return None
+
+        return self._get_cached(
+            self._audit_writer_cache, self._get_db_cache_key(),
+            lambda: AuditWriter(
+                self.get_db_connection(),
+                max_queue_size=int(self.config.AUDIT_QUEUE_SIZE),
+                batch_size=int(self.config.AUDIT_BATCH_SIZE),
+                flush_interval=self.config.AUDIT_FLUSH_INTERVAL,
+                put_timeout=self.config.AUDIT_QUEUE_TIMEOUT
+            )
+        )
 
     def _get_rabbitmq_connection(self):
         return RabbitMqConnection(
@@ -98,15 +233,40 @@ class RepositoryFactory:
         )
 
     def get_adapter(self):
-        return self._get_rabbitmq_connection()
+        """
+        Returns the shared message adapter. The broker connection is only opened, and its
+        credentials only read from the config, on the first publish.
+        """
+        return self._get_cached(
+            self._adapter_cache, self._get_rabbitmq_cache_key(),
+            lambda: LazyMessageAdapter(self._get_rabbitmq_connection)
+        )
+
+    def get_repository(
+            self, repo_type: RepoType, person_id=None, message_queue_name: str = "", messaging: bool = True
+    ):
+        """
+        Returns a repository of the given type.
 
-    def get_repository(self, repo_type: RepoType, person_id=None, message_queue_name: str = ""):
-        adapter = self.get_db_connection()
-        message_adapter = self.get_adapter()
+        Pass `messaging=False` for repositories that never publish; they are built without a message adapter.
+        """
         repo_class = self._repositories.get(repo_type)
 
-        if repo_class:
-            import threading
-            return repo_class(adapter, message_adapter, message_queue_name, person_id)
+        if not repo_class:
+            raise ValueError(f"No repository found with the name '{repo_type}'")
+
+        def build_repository():
+            adapter = self.get_db_connection()
+            message_adapter = self.get_adapter() if messaging else None
+            return repo_class(
+                adapter, message_adapter, message_queue_name, person_id, audit_mode=self.get_audit_mode(),
+                audit_writer=self.get_audit_writer()
+            )
+
+        if person_id is not None:
+            # Repositories bound to a person are cheap on top of the shared adapters and are not cached,
+            # so the cache does not grow with the number of users.
+            return build_repository()
 
-        raise ValueError(f"No repository found with the name '{repo_type}'")
+        cache_key = (self._get_db_cache_key(), repo_type, message_queue_name, messaging)
+        return self._get_cached(self._repository_cache, cache_key, build_repository)
@@ -0,0 +1,53 @@
+import threading
+from typing import Callable
+
+from rococo.messaging.base import MessageAdapter
+
+
+class LazyMessageAdapter(MessageAdapter):
+    """
+    Message adapter proxy that builds and connects the real adapter on first use.
+
+    Repositories that never publish never resolve broker credentials or open a connection.
+    """
+
+    def __init__(self, adapter_builder: Callable[[], MessageAdapter]):
+        super().__init__()
+        self._adapter_builder = adapter_builder
+        self._adapter = None
+        self._lock = threading.RLock()
+
+    @property
+    def is_connected(self) -> bool:
+        return self._adapter is not None
+
+    def _get_adapter(self) -> MessageAdapter:
+        if self._adapter is None:
+            with self._lock:
+                if self._adapter is None:
+                    adapter = self._adapter_builder()
+                    adapter.__enter__()
+                    self._adapter = adapter
+        return self._adapter
+
+    def send_message(self, queue_name: str, message: dict, **kwargs):
+        # A single broker channel is not thread safe, so publishing is serialized.
+        with self._lock:
+            return self._get_adapter().send_message(queue_name, message, **kwargs)
+
+    def consume_messages(self, queue_name: str, callback_function: callable = None, **kwargs):
+        return self._get_adapter().consume_messages(queue_name, callback_function, **kwargs)
+
+    def __enter__(self):
+        self._get_adapter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # The connection is shared by every repository of the process, so it stays open.
+        pass
+
+    def close(self):
+        with self._lock:
+            if self._adapter is not None:
+                self._adapter.__exit__(None, None, None)
+                self._adapter = None
@@ -1,4 +1,5 @@
 from common.repositories.base import BaseRepository
+from common.repositories.routing import read_only
 from common.models.organization import Organization
 
 
@@ -15,6 +16,6 @@ class OrganizationRepository(BaseRepository):
         """
         params = (person_id,)
 
-        with self.adapter:
+        with read_only(), self.adapter:
             results = self.adapter.execute_query(query, params)
             return results
@@ -1,6 +1,11 @@
 from common.repositories.base import BaseRepository
+from common.repositories.async_base import AsyncBaseRepository
 from common.models.person import Person
 
 
 class PersonRepository(BaseRepository):
     MODEL = Person
+
+
+class AsyncPersonRepository(AsyncBaseRepository):
+    MODEL = Person
@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+
+from common.app_logger import logger
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe, bounded pool of PostgreSQL connections for code that runs outside of a Flask app context
+    (workers, scripts, background threads).
+
+    Idle connections are evicted after `max_idle` seconds, every connection is retired after `max_lifetime`
+    seconds, and connections are pinged before being handed out.
+    """
+
+    def __init__(
+            self, connect_kwargs: dict, max_size: int = 10, timeout: float = 30, max_idle: float = 300,
+            max_lifetime: float = 3600, creator=psycopg2.connect
+    ):
+        self._connect_kwargs = connect_kwargs
+        self._max_size = max_size
+        self._timeout = timeout
+        self._max_idle = max_idle
+        self._max_lifetime = max_lifetime
+        self._creator = creator
+
+        self._condition = threading.Condition()
+        self._idle = deque()  # (connection, created_at, released_at), most recently released on the right
+        self._in_use = {}  # id(connection) -> (connection, created_at)
+        self._size = 0
+        self._pid = os.getpid()
+
+    def _reset_after_fork(self):
+        # Connections inherited from the parent process must not be used or closed by the child.
+        if self._pid != os.getpid():
+            self._idle.clear()
+            self._in_use.clear()
+            self._size = 0
+            self._pid = os.getpid()
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][2] > self._max_idle:
+            connection, _, _ = self._idle.popleft()
+            self._size -= 1
+            self._discard(connection)
+
+    def _is_expired(self, created_at):
+        return self._max_lifetime is not None and time.monotonic() - created_at > self._max_lifetime
+
+    def _ping(self, connection) -> bool:
+        if connection.closed:
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self, deadline):
+        """Returns an idle (connection, created_at) pair, or None when a slot for a new connection is reserved."""
+        with self._condition:
+            self._reset_after_fork()
+            while True:
+                self._evict_idle()
+                if self._idle:
+                    connection, created_at, _ = self._idle.pop()
+                    return connection, created_at
+                if self._size < self._max_size:
+                    self._size += 1
+                    return None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"Timed out waiting for a database connection ({self._max_size} connections in use)."
+                    )
+                self._condition.wait(remaining)
+
+    def _give_back_slot(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def connection(self):
+        """Returns a validated connection. It must be handed back with `release()`."""
+        deadline = time.monotonic() + self._timeout
+        while True:
+            checked_out = self._checkout(deadline)
+            if checked_out is None:
+                try:
+                    connection = self._creator(**self._connect_kwargs)
+                except Exception:
+                    self._give_back_slot()
+                    raise
+                created_at = time.monotonic()
+            else:
+                connection, created_at = checked_out
+                if self._is_expired(created_at) or not self._ping(connection):
+                    self._discard(connection)
+                    self._give_back_slot()
+                    continue
+
+            with self._condition:
+                self._in_use[id(connection)] = (connection, created_at)
+            return connection
+
+    def release(self, connection) -> bool:
+        """
+        Returns a connection to the pool. Returns False if the connection was not handed out by this pool.
+        """
+        with self._condition:
+            entry = self._in_use.pop(id(connection), None)
+            if entry is None or entry[0] is not connection:
+                return False
+
+        _, created_at = entry
+        reusable = not connection.closed and not self._is_expired(created_at)
+        if reusable:
+            try:
+                # Drop any transaction left open by a read, so the next borrower starts clean.
+                connection.rollback()
+            except psycopg2.Error:
+                reusable = False
+
+        with self._condition:
+            if reusable:
+                self._idle.append((connection, created_at, time.monotonic()))
+            else:
+                self._size -= 1
+            self._condition.notify()
+
+        if not reusable:
+            self._discard(connection)
+        return True
+
+    def close(self):
+        """Closes every idle connection. Connections in use are closed when they are released."""
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+            self._size -= len(idle)
+            self._max_lifetime = 0
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(connect_kwargs: dict, **pool_settings) -> ConnectionPool:
+    """Returns the process-wide pool for the given connection arguments, creating it on first use."""
+    key = tuple(sorted(connect_kwargs.items()))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                logger.debug(f"Creating connection pool for {connect_kwargs.get('host')}:{connect_kwargs.get('port')}")
+                pool = ConnectionPool(dict(connect_kwargs), **pool_settings)
+                _pools[key] = pool
+    return pool
+
+
+def release_connection(connection) -> bool:
+    """Hands a connection back to the pool it came from. Returns False if no pool owns it."""
+    return any(pool.release(connection) for pool in list(_pools.values()))
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,63 @@
+import contextvars
+from contextlib import contextmanager
+
+_read_only = contextvars.ContextVar('db_read_only', default=False)
+_wrote_to_primary = contextvars.ContextVar('db_wrote_to_primary', default=False)
+
+
+def _get_request_state():
+    """Returns `flask.g` when running inside a Flask app context, otherwise None."""
+    try:
+        from flask import g, has_app_context
+        if has_app_context():
+            return g
+    except ImportError:
+        pass
+    return None
+
+
+@contextmanager
+def read_only():
+    """Marks the connections opened inside the block as read-only, so they may be served by a replica."""
+    token = _read_only.set(True)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+@contextmanager
+def routing_scope():
+    """
+    Scope of read-your-writes stickiness for code running outside of a request, e.g. one job of a worker.
+    Inside a Flask app context the scope is the request itself.
+    """
+    token = _wrote_to_primary.set(False)
+    try:
+        yield
+    finally:
+        _wrote_to_primary.reset(token)
+
+
+def stick_to_primary():
+    """Routes every following read of the current request (or routing scope) to the primary."""
+    request_state = _get_request_state()
+    if request_state is not None:
+        request_state.db_wrote_to_primary = True
+    else:
+        _wrote_to_primary.set(True)
+
+
+def mark_primary_write():
+    """Called before writing, so every following read of the current request (or routing scope) sees the write."""
+    stick_to_primary()
+
+
+def should_use_replica() -> bool:
+    if not _read_only.get():
+        return False
+
+    request_state = _get_request_state()
+    if request_state is not None:
+        return not getattr(request_state, 'db_wrote_to_primary', False)
+    return not _wrote_to_primary.get()
@@ -1,6 +1,620 @@
+from contextlib import ExitStack
+from typing import Iterator, List, Optional, Tuple
+
 from common.repositories.base import BaseRepository
+from common.repositories.async_base import AsyncBaseRepository
+from common.repositories.routing import read_only, mark_primary_write, should_use_replica
 from common.models.todo import Todo
 
 
-class TodoListRepository(BaseRepository):
+class TodoQueriesMixin:
+    """
+    Todo specific queries shared by the sync and async repositories.
+
+    Positions are spaced by POSITION_GAP, so a todo can be inserted or moved by giving it a position
+    between its new neighbours, without renumbering them. The list of a person is only renumbered
+    when two neighbours have no gap left.
+    """
+
+    POSITION_GAP = 1024
+
+    def _process_data_before_save(self, instance: Todo):
+        """Keeps the microseconds of `changed_on`, which orders the feed of changes."""
+        data = super()._process_data_before_save(instance)
+        data['changed_on'] = instance.changed_on.strftime('%Y-%m-%d %H:%M:%S.%f')
+        return data
+
+    def _get_page_query(self, person_id: str, is_completed: bool = None, after: tuple = None, limit: int = None):
+        """Returns a query for the active todos of a person, in list order, starting after the
+        `(position, entity_id)` key `after`."""
+        conditions = ["person_id = %s", "active = true"]
+        params = [person_id]
+        if is_completed is not None:
+            conditions.append("is_completed = %s")
+            params.append(is_completed)
+        if after is not None:
+            conditions.append("(position, entity_id) > (%s, %s)")
+            params.extend(after)
+
+        query = f"SELECT * FROM {self.table_name} WHERE {' AND '.join(conditions)} ORDER BY position, entity_id"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query, tuple(params)
+
+    def _get_search_query(self, person_id: str, text: str, after: tuple = None, limit: int = None):
+        """
+        Returns a query for the active todos of a person whose title contains `text`, case-insensitively, with
+        their trigram similarity to it as `rank`. The most similar come first, starting after the
+        `(rank, entity_id)` key `after`.
+        """
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = (
+            f"SELECT * FROM ("
+            f"SELECT {self.table_name}.*, similarity(title, %s)::double precision AS rank FROM {self.table_name} "
+            f"WHERE person_id = %s AND active = true AND title ILIKE %s"
+            f") AS matches"
+        )
+        params = [text, person_id, pattern]
+        if after is not None:
+            query += " WHERE (rank < %s OR (rank = %s AND entity_id > %s))"
+            params.extend((after[0], after[0], after[1]))
+
+        query += " ORDER BY rank DESC, entity_id"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query, tuple(params)
+
+    def _get_changes_query(self, person_id: str, after: tuple = None, limit: int = None, delay: float = 0):
+        """
+        Returns a query for the todos of a person, deleted ones included, in the order they were last changed,
+        starting after the `(changed_on, entity_id)` key `after`. Changes more recent than `delay` seconds are
+        left for a later call, so that a write still in flight does not land behind a returned key.
+        """
+        conditions = ["person_id = %s", f"changed_on < {self.NOW_SQL} - make_interval(secs => %s)"]
+        params = [person_id, delay]
+        if after is not None:
+            conditions.append("(changed_on, entity_id) > (%s, %s)")
+            params.extend(after)
+
+        query = f"SELECT * FROM {self.table_name} WHERE {' AND '.join(conditions)} ORDER BY changed_on, entity_id"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query, tuple(params)
+
+    def _get_list_version_query(self, person_id: str):
+        """Returns a query for the revision of the counters of a person, which the triggers of `todo` bump
+        whenever a todo of the list is created, saved or deleted."""
+        query = (
+            f"SELECT COALESCE((SELECT revision FROM {self.table_name}_counter WHERE person_id = %s), 0)::text "
+            f"AS list_version"
+        )
+        return query, (person_id,)
+
+    def _get_summary_query(self, person_id: str):
+        query = (
+            f"SELECT total_count, active_count, completed_count, revision "
+            f"FROM {self.table_name}_counter WHERE person_id = %s"
+        )
+        return query, (person_id,)
+
+    @staticmethod
+    def _get_summary(rows) -> dict:
+        return rows[0] if rows else dict(total_count=0, active_count=0, completed_count=0, revision=0)
+
+    def _get_insert_query(self, rows: List[dict]):
+        """
+        Returns a single query inserting new todos, as processed by `_process_data_before_save`. They are
+        stamped with the database clock, like the updates, once the list lock is held: a todo written after
+        a long wait for the lock still shows up after the cursors of GET /todo/changes handed out meanwhile.
+        """
+        query, params = self._get_bulk_insert_query(rows, {"changed_on": self.CLOCK_SQL})
+        return f"{query} RETURNING entity_id, changed_on", params
+
+    @staticmethod
+    def _set_changed_on(todos: List[Todo], rows: List[dict]):
+        changed_on = {row['entity_id']: row['changed_on'] for row in rows}
+        for todo in todos:
+            todo.changed_on = changed_on[todo.entity_id]
+
+    def _get_lock_list_query(self, person_id: str):
+        """
+        Returns a query locking the list of a person until the end of the transaction, so positions read in
+        it are still free when it writes. Different lists may share a lock, which only makes them wait.
+        """
+        return "SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))", (f"{self.table_name}:{person_id}",)
+
+    def _get_top_position_query(self, person_id: str):
+        query = f"SELECT MIN(position) AS position FROM {self.table_name} WHERE person_id = %s AND active = true"
+        return query, (person_id,)
+
+    def _get_neighbour_positions_query(self, person_id: str, entity_id: str, after_id: str = None):
+        """Returns the positions between which `entity_id` goes when moved after `after_id`, or to the top."""
+        table = self.table_name
+        if after_id is None:
+            query = (
+                f"SELECT NULL AS previous, MIN(position) AS following FROM {table} "
+                f"WHERE person_id = %s AND active = true AND entity_id <> %s"
+            )
+            return query, (person_id, entity_id)
+
+        query = (
+            f"SELECT anchor.position AS previous, ("
+            f"SELECT MIN(position) FROM {table} WHERE person_id = %s AND active = true "
+            f"AND entity_id <> %s AND position > anchor.position"
+            f") AS following FROM {table} AS anchor "
+            f"WHERE anchor.entity_id = %s AND anchor.person_id = %s AND anchor.active = true"
+        )
+        return query, (person_id, entity_id, after_id, person_id)
+
+    def _get_rebalance_query(self, person_id: str, changed_by_id: str = None):
+        table = self.table_name
+        return self._get_versioned_update_query(
+            "position = ranked.position",
+            "person_id = %s AND active = true",
+            where_params=(person_id,),
+            changed_by_id=changed_by_id,
+            source=(
+                f"(SELECT entity_id, ROW_NUMBER() OVER (ORDER BY position, created_on, entity_id) * %s AS position "
+                f"FROM {table} WHERE person_id = %s AND active = true) AS ranked"
+            ),
+            source_params=(self.POSITION_GAP, person_id)
+        )
+
+    def _get_positions_query(self, person_id: str, entity_ids: list):
+        query = (
+            f"SELECT entity_id, position FROM {self.table_name} "
+            f"WHERE person_id = %s AND active = true AND entity_id = ANY(%s)"
+        )
+        return query, (person_id, list(entity_ids))
+
+    def _get_set_positions_query(self, person_id: str, positions: dict, changed_by_id: str = None):
+        values = ", ".join(["(%s, %s::bigint)"] * len(positions))
+        return self._get_versioned_update_query(
+            "position = reordered.position",
+            "person_id = %s AND active = true AND entity_id = ANY(%s)",
+            where_params=(person_id, list(positions)),
+            changed_by_id=changed_by_id,
+            source=f"(VALUES {values}) AS reordered(entity_id, position)",
+            source_params=tuple(value for item in positions.items() for value in item)
+        )
+
+    def _get_set_completed_query(self, person_id: str, is_completed: bool, changed_by_id: str = None):
+        return self._get_versioned_update_query(
+            "is_completed = %s",
+            "person_id = %s AND active = true AND is_completed <> %s",
+            where_params=(person_id, is_completed),
+            assignment_params=(is_completed,),
+            changed_by_id=changed_by_id
+        )
+
+    def _get_delete_completed_query(self, person_id: str, changed_by_id: str = None):
+        return self._get_versioned_update_query(
+            "active = false",
+            "person_id = %s AND active = true AND is_completed = true",
+            where_params=(person_id,),
+            changed_by_id=changed_by_id
+        )
+
+    def _get_update_one_query(
+            self, person_id: str, entity_id: str, assignments: str, assignment_params: tuple = (),
+            version: str = None, changed_by_id: str = None
+    ):
+        """
+        Returns a query updating an active todo of a person and returning it, which only matches when the
+        todo is still at `version`, if given.
+        """
+        where = "entity_id = %s AND person_id = %s AND active = true"
+        where_params = (entity_id, person_id)
+        if version is not None:
+            where += " AND version = %s"
+            where_params += (version,)
+        return self._get_versioned_update_query(
+            assignments, where,
+            where_params=where_params,
+            assignment_params=assignment_params,
+            changed_by_id=changed_by_id,
+            returning=f"{self.table_name}.*"
+        )
+
+    def _get_update_fields_query(
+            self, person_id: str, entity_id: str, values: dict, version: str = None, changed_by_id: str = None
+    ):
+        return self._get_update_one_query(
+            person_id, entity_id, ", ".join(f"{column} = %s" for column in values), tuple(values.values()),
+            version, changed_by_id
+        )
+
+    def _get_toggle_completed_query(
+            self, person_id: str, entity_id: str, version: str = None, changed_by_id: str = None
+    ):
+        return self._get_update_one_query(
+            person_id, entity_id, f"is_completed = NOT {self.table_name}.is_completed",
+            version=version, changed_by_id=changed_by_id
+        )
+
+    def _get_delete_one_query(self, person_id: str, entity_id: str, version: str = None, changed_by_id: str = None):
+        return self._get_update_one_query(
+            person_id, entity_id, "active = false", version=version, changed_by_id=changed_by_id
+        )
+
+    @staticmethod
+    def _get_reordered_positions(todo_ids: list, positions: dict):
+        """
+        Gives the todos the positions they already hold, in the order of `todo_ids`, so the rest of the list
+        keeps its place. Returns the positions that changed, or None when two todos share a position.
+        """
+        slots = sorted(positions.values())
+        if any(previous >= following for previous, following in zip(slots, slots[1:])):
+            return None
+        return {
+            todo_id: slot for todo_id, slot in zip(todo_ids, slots) if positions[todo_id] != slot
+        }
+
+    def _assign_top_positions(self, todos: List[Todo], top_position: int = None):
+        """Positions the todos, in order, before the current top position."""
+        first_position = self._get_position_between(following=top_position) - (len(todos) - 1) * self.POSITION_GAP
+        for index, todo in enumerate(todos):
+            todo.position = first_position + index * self.POSITION_GAP
+
+    def _get_position_between(self, previous: int = None, following: int = None):
+        """Returns a position between two neighbours, None standing for an end of the list.
+        Returns None when the neighbours have no gap left."""
+        if previous is None and following is None:
+            return 0
+        if previous is None:
+            return following - self.POSITION_GAP
+        if following is None:
+            return previous + self.POSITION_GAP
+        if following - previous > 1:
+            return (previous + following) // 2
+        return None
+
+
+class TodoListRepository(TodoQueriesMixin, BaseRepository):
     MODEL = Todo
+
+    def get_page(
+            self, person_id: str, is_completed: bool = None, after: tuple = None, limit: int = None
+    ) -> List[Todo]:
+        """
+        Returns the active todos of a person in list order, sorted by the database. `after` is the
+        `(position, entity_id)` key of the last todo of the previous page.
+        """
+        with read_only(), self.adapter:
+            rows = self.adapter.execute_query(*self._get_page_query(person_id, is_completed, after, limit))
+        return [self.model.from_dict(row) for row in rows]
+
+    def get_changes(self, person_id: str, after: tuple = None, limit: int = None, delay: float = 0) -> List[Todo]:
+        """Returns the todos of a person changed after the `(changed_on, entity_id)` key `after`, deleted ones
+        included, in the order they were changed."""
+        with read_only(), self.adapter:
+            rows = self.adapter.execute_query(*self._get_changes_query(person_id, after, limit, delay))
+        return [self.model.from_dict(row) for row in rows]
+
+    def get_list_version(self, person_id: str) -> str:
+        with read_only(), self.adapter:
+            rows = self.adapter.execute_query(*self._get_list_version_query(person_id))
+        return rows[0]['list_version']
+
+    def search(
+            self, person_id: str, text: str, after: tuple = None, limit: int = None
+    ) -> List[Tuple[Todo, float]]:
+        """Returns the active todos of a person whose title contains `text`, with their rank, best matches first."""
+        with read_only(), self.adapter:
+            rows = self.adapter.execute_query(*self._get_search_query(person_id, text, after, limit))
+        return [(self.model.from_dict(row), row['rank']) for row in rows]
+
+    def get_summary(self, person_id: str) -> dict:
+        """Returns the number of todos of a person, in total, active and completed, and their revision."""
+        with read_only(), self.adapter:
+            rows = self.adapter.execute_query(*self._get_summary_query(person_id))
+        return self._get_summary(rows)
+
+    def iter_page(
+            self, person_id: str, is_completed: bool = None, after: tuple = None, limit: int = None
+    ) -> Iterator[Todo]:
+        """Same as `get_page`, but reads the todos with a server-side cursor and yields them one at a time."""
+        with ExitStack() as stack:
+            # Only the connection is picked as read-only, the rows may be consumed outside of this call
+            with read_only():
+                stack.enter_context(self.adapter)
+            query, params = self._get_page_query(person_id, is_completed, after, limit)
+            for row in self.adapter.iter_query(query, params):
+                yield self.model.from_dict(row)
+
+    def insert_at_top(self, todo: Todo) -> Todo:
+        """Saves a new todo before the first one of the person's list."""
+        mark_primary_write()
+        with self.adapter, self.adapter.transaction():
+            self._lock_list(todo.person_id)
+            rows = self.adapter.execute_query(*self._get_top_position_query(todo.person_id))
+            todo.position = self._get_position_between(following=rows[0]['position'] if rows else None)
+            rows = self.adapter.execute_returning_query(
+                *self._get_insert_query([self._process_data_before_save(todo)])
+            )
+        self._set_changed_on([todo], rows)
+        return todo
+
+    def insert_many_at_top(self, todos: List[Todo]) -> List[Todo]:
+        """Saves new todos before the first one of the person's list, keeping their order, with one insert."""
+        mark_primary_write()
+        with self.adapter, self.adapter.transaction():
+            self._lock_list(todos[0].person_id)
+            rows = self.adapter.execute_query(*self._get_top_position_query(todos[0].person_id))
+            self._assign_top_positions(todos, rows[0]['position'] if rows else None)
+            data = [self._process_data_before_save(todo) for todo in todos]
+            rows = self.adapter.execute_returning_query(*self._get_insert_query(data))
+        self._set_changed_on(todos, rows)
+        return todos
+
+    def move(self, todo: Todo, after_id: str = None, changed_by_id: str = None) -> Optional[Todo]:
+        """
+        Moves a todo right after the todo `after_id`, or to the top of the list. Only the position of the moved
+        todo is saved, unless its new neighbours have no gap left and the list has to be renumbered first.
+        Returns the saved todo, or None when either todo is not an active todo of the person.
+        """
+        mark_primary_write()
+        with self.adapter, self.adapter.transaction():
+            self._lock_list(todo.person_id)
+            neighbours = self._find_neighbours(todo, after_id)
+            if neighbours is None:
+                return None
+
+            position = self._get_position_between(*neighbours)
+            if position is None:
+                self._rebalance(todo.person_id)
+                position = self._get_position_between(*self._find_neighbours(todo, after_id))
+
+            rows = self.adapter.execute_returning_query(*self._get_update_fields_query(
+                todo.person_id, todo.entity_id, {"position": position}, changed_by_id=changed_by_id
+            ))
+        return self.model.from_dict(rows[0]) if rows else None
+
+    def reorder(self, person_id: str, todo_ids: list) -> int:
+        """
+        Reorders the given todos of a person in a single statement, saving only the ones whose position
+        changed. Returns the number of todos saved, or None when any of them is not an active todo of the person.
+        """
+        todo_ids = list(dict.fromkeys(todo_ids))
+        mark_primary_write()
+        with self.adapter, self.adapter.transaction():
+            self._lock_list(person_id)
+            positions = self._find_positions(person_id, todo_ids)
+            if len(positions) != len(todo_ids):
+                return None
+
+            new_positions = self._get_reordered_positions(todo_ids, positions)
+            if new_positions is None:
+                self._rebalance(person_id)
+                new_positions = self._get_reordered_positions(todo_ids, self._find_positions(person_id, todo_ids))
+            if not new_positions:
+                return 0
+
+            return self.adapter.run_transaction([self._get_set_positions_query(person_id, new_positions)])[0]
+
+    def set_completed(self, person_id: str, is_completed: bool, changed_by_id: str = None) -> int:
+        """Marks every active todo of a person as completed or not in one statement. Returns the number of todos saved."""
+        mark_primary_write()
+        with self.adapter:
+            return self.adapter.run_transaction(
+                [self._get_set_completed_query(person_id, is_completed, changed_by_id)]
+            )[0]
+
+    def delete_completed(self, person_id: str, changed_by_id: str = None) -> int:
+        """Deletes every completed todo of a person in one statement. Returns the number of todos deleted."""
+        mark_primary_write()
+        with self.adapter:
+            return self.adapter.run_transaction([self._get_delete_completed_query(person_id, changed_by_id)])[0]
+
+    def update_fields(
+            self, person_id: str, entity_id: str, values: dict, version: str = None, changed_by_id: str = None
+    ) -> Optional[Todo]:
+        """
+        Sets columns of an active todo of a person in one statement, without reading it first. Returns the
+        saved todo, or None when it does not exist or is no longer at `version`.
+        """
+        return self._update_one(self._get_update_fields_query(person_id, entity_id, values, version, changed_by_id))
+
+    def toggle_completed(
+            self, person_id: str, entity_id: str, version: str = None, changed_by_id: str = None
+    ) -> Optional[Todo]:
+        """Flips the completion status of an active todo of a person in one statement, see `update_fields`."""
+        return self._update_one(self._get_toggle_completed_query(person_id, entity_id, version, changed_by_id))
+
+    def delete_one(
+            self, person_id: str, entity_id: str, version: str = None, changed_by_id: str = None
+    ) -> Optional[Todo]:
+        """Deletes an active todo of a person in one statement, see `update_fields`."""
+        return self._update_one(self._get_delete_one_query(person_id, entity_id, version, changed_by_id))
+
+    def rebalance(self, person_id: str) -> int:
+        """Renumbers the list of a person with evenly spaced positions. Returns the number of todos saved."""
+        mark_primary_write()
+        with self.adapter, self.adapter.transaction():
+            self._lock_list(person_id)
+            return self._rebalance(person_id)
+
+    def _update_one(self, query) -> Optional[Todo]:
+        mark_primary_write()
+        with self.adapter:
+            rows = self.adapter.execute_returning_query(*query)
+        return self.model.from_dict(rows[0]) if rows else None
+
+    # The helpers below run in the transaction of their caller, which holds the lock of the list
+
+    def _lock_list(self, person_id: str):
+        self.adapter.execute_query(*self._get_lock_list_query(person_id))
+
+    def _rebalance(self, person_id: str) -> int:
+        return self.adapter.run_transaction([self._get_rebalance_query(person_id)])[0]
+
+    def _find_neighbours(self, todo: Todo, after_id: str = None):
+        rows = self.adapter.execute_query(
+            *self._get_neighbour_positions_query(todo.person_id, todo.entity_id, after_id)
+        )
+        return (rows[0]['previous'], rows[0]['following']) if rows else None
+
+    def _find_positions(self, person_id: str, todo_ids: list) -> dict:
+        rows = self.adapter.execute_query(*self._get_positions_query(person_id, todo_ids))
+        return {row['entity_id']: row['position'] for row in rows}
+
+
+class AsyncTodoListRepository(TodoQueriesMixin, AsyncBaseRepository):
+    MODEL = Todo
+
+    async def get_page(
+            self, person_id: str, is_completed: bool = None, after: tuple = None, limit: int = None
+    ) -> List[Todo]:
+        with read_only():
+            rows = await self.adapter.execute_query(*self._get_page_query(person_id, is_completed, after, limit))
+        return [self.model.from_dict(row) for row in rows]
+
+    async def get_changes(
+            self, person_id: str, after: tuple = None, limit: int = None, delay: float = 0
+    ) -> List[Todo]:
+        with read_only():
+            rows = await self.adapter.execute_query(*self._get_changes_query(person_id, after, limit, delay))
+        return [self.model.from_dict(row) for row in rows]
+
+    async def get_list_version(self, person_id: str) -> str:
+        with read_only():
+            rows = await self.adapter.execute_query(*self._get_list_version_query(person_id))
+        return rows[0]['list_version']
+
+    async def search(
+            self, person_id: str, text: str, after: tuple = None, limit: int = None
+    ) -> List[Tuple[Todo, float]]:
+        with read_only():
+            rows = await self.adapter.execute_query(*self._get_search_query(person_id, text, after, limit))
+        return [(self.model.from_dict(row), row['rank']) for row in rows]
+
+    async def get_summary(self, person_id: str) -> dict:
+        with read_only():
+            rows = await self.adapter.execute_query(*self._get_summary_query(person_id))
+        return self._get_summary(rows)
+
+    async def iter_page(self, person_id: str, is_completed: bool = None, after: tuple = None, limit: int = None):
+        # Only the connection is picked as read-only, the rows may be consumed outside of this call
+        with read_only():
+            replica = should_use_replica()
+        query, params = self._get_page_query(person_id, is_completed, after, limit)
+        async for row in self.adapter.iter_query(query, params, replica=replica):
+            yield self.model.from_dict(row)
+
+    async def insert_at_top(self, todo: Todo) -> Todo:
+        mark_primary_write()
+        async with self.adapter.transaction():
+            await self._lock_list(todo.person_id)
+            rows = await self.adapter.execute_query(*self._get_top_position_query(todo.person_id))
+            todo.position = self._get_position_between(following=rows[0]['position'] if rows else None)
+            rows = await self.adapter.execute_returning_query(
+                *self._get_insert_query([self._process_data_before_save(todo)])
+            )
+        self._set_changed_on([todo], rows)
+        return todo
+
+    async def insert_many_at_top(self, todos: List[Todo]) -> List[Todo]:
+        mark_primary_write()
+        async with self.adapter.transaction():
+            await self._lock_list(todos[0].person_id)
+            rows = await self.adapter.execute_query(*self._get_top_position_query(todos[0].person_id))
+            self._assign_top_positions(todos, rows[0]['position'] if rows else None)
+            data = [self._process_data_before_save(todo) for todo in todos]
+            rows = await self.adapter.execute_returning_query(*self._get_insert_query(data))
+        self._set_changed_on(todos, rows)
+        return todos
+
+    async def move(self, todo: Todo, after_id: str = None, changed_by_id: str = None) -> Optional[Todo]:
+        mark_primary_write()
+        async with self.adapter.transaction():
+            await self._lock_list(todo.person_id)
+            neighbours = await self._find_neighbours(todo, after_id)
+            if neighbours is None:
+                return None
+
+            position = self._get_position_between(*neighbours)
+            if position is None:
+                await self._rebalance(todo.person_id)
+                position = self._get_position_between(*await self._find_neighbours(todo, after_id))
+
+            rows = await self.adapter.execute_returning_query(*self._get_update_fields_query(
+                todo.person_id, todo.entity_id, {"position": position}, changed_by_id=changed_by_id
+            ))
+        return self.model.from_dict(rows[0]) if rows else None
+
+    async def reorder(self, person_id: str, todo_ids: list) -> int:
+        mark_primary_write()
+        todo_ids = list(dict.fromkeys(todo_ids))
+        async with self.adapter.transaction():
+            await self._lock_list(person_id)
+            positions = await self._find_positions(person_id, todo_ids)
+            if len(positions) != len(todo_ids):
+                return None
+
+            new_positions = self._get_reordered_positions(todo_ids, positions)
+            if new_positions is None:
+                await self._rebalance(person_id)
+                new_positions = self._get_reordered_positions(
+                    todo_ids, await self._find_positions(person_id, todo_ids)
+                )
+            if not new_positions:
+                return 0
+
+            return (await self.adapter.run_transaction([self._get_set_positions_query(person_id, new_positions)]))[0]
+
+    async def set_completed(self, person_id: str, is_completed: bool, changed_by_id: str = None) -> int:
+        mark_primary_write()
+        return (await self.adapter.run_transaction(
+            [self._get_set_completed_query(person_id, is_completed, changed_by_id)]
+        ))[0]
+
+    async def delete_completed(self, person_id: str, changed_by_id: str = None) -> int:
+        mark_primary_write()
+        return (await self.adapter.run_transaction([self._get_delete_completed_query(person_id, changed_by_id)]))[0]
+
+    async def update_fields(
+            self, person_id: str, entity_id: str, values: dict, version: str = None, changed_by_id: str = None
+    ) -> Optional[Todo]:
+        return await self._update_one(
+            self._get_update_fields_query(person_id, entity_id, values, version, changed_by_id)
+        )
+
+    async def toggle_completed(
+            self, person_id: str, entity_id: str, version: str = None, changed_by_id: str = None
+    ) -> Optional[Todo]:
+        return await self._update_one(self._get_toggle_completed_query(person_id, entity_id, version, changed_by_id))
+
+    async def delete_one(
+            self, person_id: str, entity_id: str, version: str = None, changed_by_id: str = None
+    ) -> Optional[Todo]:
+        return await self._update_one(self._get_delete_one_query(person_id, entity_id, version, changed_by_id))
+
+    async def rebalance(self, person_id: str) -> int:
+        mark_primary_write()
+        async with self.adapter.transaction():
+            await self._lock_list(person_id)
+            return await self._rebalance(person_id)
+
+    async def _update_one(self, query) -> Optional[Todo]:
+        mark_primary_write()
+        rows = await self.adapter.execute_returning_query(*query)
+        return self.model.from_dict(rows[0]) if rows else None
+
+    async def _lock_list(self, person_id: str):
+        await self.adapter.execute_query(*self._get_lock_list_query(person_id))
+
+    async def _rebalance(self, person_id: str) -> int:
+        return (await self.adapter.run_transaction([self._get_rebalance_query(person_id)]))[0]
+
+    async def _find_neighbours(self, todo: Todo, after_id: str = None):
+        rows = await self.adapter.execute_query(
+            *self._get_neighbour_positions_query(todo.person_id, todo.entity_id, after_id)
+        )
+        return (rows[0]['previous'], rows[0]['following']) if rows else None
+
+    async def _find_positions(self, person_id: str, todo_ids: list) -> dict:
+        rows = await self.adapter.execute_query(*self._get_positions_query(person_id, todo_ids))
+        return {row['entity_id']: row['position'] for row in rows}
@@ -0,0 +1,71 @@
+from typing import List, Tuple
+
+from rococo.models import VersionedModel
+
+from common.repositories.base import BaseRepository
+from common.repositories.routing import mark_primary_write
+
+
+class UnitOfWork:
+    """
+    Collects saves across several repositories and flushes them in a single transaction, with one audit
+    insert and one multi-row upsert per table. Nothing is written when the transaction fails, so a crash
+    halfway through does not leave a partial set of rows behind.
+
+    The repositories must share their database adapter, which those of `RepositoryFactory` do.
+
+        with UnitOfWork() as unit_of_work:
+            unit_of_work.save(person_repo, person)
+            unit_of_work.save(email_repo, email)
+
+    The saves are flushed when the block exits without an exception. Unlike `BaseRepository.save`, a unit
+    of work does not send messages to the repositories' queues.
+    """
+
+    def __init__(self):
+        self._saves: List[Tuple[BaseRepository, VersionedModel]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self._saves.clear()
+
+    def save(self, repository: BaseRepository, instance: VersionedModel) -> VersionedModel:
+        """Queues `instance` to be saved by `repository` when the unit of work is flushed."""
+        if self._saves and repository.adapter is not self._saves[0][0].adapter:
+            raise ValueError("All repositories of a unit of work must share the same database adapter.")
+
+        self._saves.append((repository, instance))
+        return instance
+
+    def delete(self, repository: BaseRepository, instance: VersionedModel) -> VersionedModel:
+        instance.active = False
+        return self.save(repository, instance)
+
+    def flush(self):
+        """Writes every queued save in one transaction."""
+        if not self._saves:
+            return
+
+        # One batch per table, in the order the tables were first saved to. An instance saved twice is
+        # only written once, with its last state.
+        batches = {}
+        for repository, instance in self._saves:
+            repository, instances = batches.setdefault(repository.table_name, (repository, {}))
+            instances[instance.entity_id] = instance
+
+        queries = []
+        for repository, instances in batches.values():
+            rows = [repository._process_data_before_save(instance) for instance in instances.values()]
+            queries.append(repository._get_bulk_move_to_audit_query(list(instances)))
+            queries.append(repository._get_bulk_save_query(rows))
+
+        adapter = self._saves[0][0].adapter
+        mark_primary_write()
+        with adapter:
+            adapter.run_transaction(queries)
+        self._saves.clear()
@@ -1,7 +1,9 @@
-from .person import PersonService
-from .email import EmailService
+from .container import ServiceContainer, get_service
+from .person import PersonService, AsyncPersonService
+from .email import EmailService, AsyncEmailService
 from .login_method import LoginMethodService
 from .organization import OrganizationService
 from .person_organization_role import PersonOrganizationRoleService
 from .auth import AuthService
-from .todo import TodoListService
\ No newline at end of file
+from .identity import IdentityService
+from .todo import TodoListService, AsyncTodoListService
@@ -1,9 +1,10 @@
 from common.services import (
     PersonService, EmailService, LoginMethodService, OrganizationService,
-    PersonOrganizationRoleService
+    PersonOrganizationRoleService, get_service
 )
 from common.models import Person, Email, LoginMethod, Organization, PersonOrganizationRole
 from common.models.login_method import LoginMethodType
+from common.repositories.unit_of_work import UnitOfWork
 from common.tasks.send_message import MessageSender
 from common.app_logger import logger
 
@@ -23,11 +24,11 @@ class AuthService:
 
         self.EMAIL_TRANSMITTER_QUEUE_NAME = config.QUEUE_NAME_PREFIX + config.EMAIL_SERVICE_PROCESSOR_QUEUE_NAME
         
-        self.person_service = PersonService(config)
-        self.email_service = EmailService(config)
-        self.login_method_service = LoginMethodService(config)
-        self.organization_service = OrganizationService(config)
-        self.person_organization_role_service = PersonOrganizationRoleService(config)
+        self.person_service = get_service(PersonService, config)
+        self.email_service = get_service(EmailService, config)
+        self.login_method_service = get_service(LoginMethodService, config)
+        self.organization_service = get_service(OrganizationService, config)
+        self.person_organization_role_service = get_service(PersonOrganizationRoleService, config)
 
         self.message_sender = MessageSender()
         
@@ -59,11 +60,14 @@ class AuthService:
             role="admin"
         )
 
-        email = self.email_service.save_email(email)
-        person = self.person_service.save_person(person)
-        login_method = self.login_method_service.save_login_method(login_method)
-        organization = self.organization_service.save_organization(organization)
-        person_organization_role = self.person_organization_role_service.save_person_organization_role(person_organization_role)
+        with UnitOfWork() as unit_of_work:
+            email = self.email_service.save_email(email, unit_of_work)
+            person = self.person_service.save_person(person, unit_of_work)
+            login_method = self.login_method_service.save_login_method(login_method, unit_of_work)
+            organization = self.organization_service.save_organization(organization, unit_of_work)
+            person_organization_role = self.person_organization_role_service.save_person_organization_role(
+                person_organization_role, unit_of_work
+            )
 
         self.send_welcome_email(login_method, person, email.email)
 
@@ -0,0 +1,58 @@
+import threading
+
+
+class ServiceContainer:
+    """
+    Holds one long-lived instance of every service for a configuration.
+
+    Services only keep their config and the shared repositories, so a single instance can serve
+    every request. Request-scoped state (the current person, email, organization) lives in `flask.g`.
+    """
+
+    _containers = {}
+    _containers_lock = threading.Lock()
+
+    def __init__(self, config):
+        self.config = config
+        self._services = {}
+        # Re-entrant, since building a service may build the services it depends on.
+        self._lock = threading.RLock()
+
+    @classmethod
+    def for_config(cls, config) -> "ServiceContainer":
+        # The container keeps a reference to its config, so the id cannot be reused while it is cached.
+        container = cls._containers.get(id(config))
+        if container is None:
+            with cls._containers_lock:
+                container = cls._containers.get(id(config))
+                if container is None:
+                    container = cls(config)
+                    cls._containers[id(config)] = container
+        return container
+
+    def get(self, service_class):
+        service = self._services.get(service_class)
+        if service is None:
+            with self._lock:
+                service = self._services.get(service_class)
+                if service is None:
+                    service = service_class(self.config)
+                    self._services[service_class] = service
+        return service
+
+    def clear(self):
+        with self._lock:
+            self._services.clear()
+
+    @classmethod
+    def clear_all(cls):
+        """Drop the services of every configuration, so they are rebuilt on the current repositories."""
+        with cls._containers_lock:
+            for container in cls._containers.values():
+                container.clear()
+            cls._containers.clear()
+
+
+def get_service(service_class, config):
+    """Returns the shared instance of `service_class` for the given config."""
+    return ServiceContainer.for_config(config).get(service_class)
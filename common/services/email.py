@@ -1,5 +1,8 @@
 from common.repositories.factory import RepositoryFactory, RepoType
+from common.repositories.unit_of_work import UnitOfWork
+from common.repositories.async_factory import AsyncRepositoryFactory
 from common.models import Email
+from common.services.identity import invalidate_identity
 
 
 class EmailService:
@@ -7,10 +10,14 @@ class EmailService:
     def __init__(self, config):
         self.config = config
         self.repository_factory = RepositoryFactory(config)
-        self.email_repo = self.repository_factory.get_repository(RepoType.EMAIL)
+        self.email_repo = self.repository_factory.get_repository(RepoType.EMAIL, messaging=False)
 
-    def save_email(self, email: Email):
-        email = self.email_repo.save(email)
+    def save_email(self, email: Email, unit_of_work: UnitOfWork = None):
+        if unit_of_work:
+            email = unit_of_work.save(self.email_repo, email)
+        else:
+            email = self.email_repo.save(email)
+        invalidate_identity(self.config, email.person_id)
         return email
 
     def get_email_by_email_address(self, email_address: str):
@@ -24,3 +31,27 @@ class EmailService:
     def verify_email(self, email: Email) -> Email:
         email.is_verified = True
         return self.save_email(email)
+
+
+class AsyncEmailService:
+
+    def __init__(self, config):
+        self.config = config
+        self.repository_factory = AsyncRepositoryFactory(config)
+        self.email_repo = self.repository_factory.get_repository(RepoType.EMAIL)
+
+    async def save_email(self, email: Email):
+        email = await self.email_repo.save(email)
+        return email
+
+    async def get_email_by_email_address(self, email_address: str):
+        email = await self.email_repo.get_one({'email': email_address})
+        return email
+
+    async def get_email_by_id(self, entity_id: str):
+        email = await self.email_repo.get_one({'entity_id': entity_id})
+        return email
+
+    async def verify_email(self, email: Email) -> Email:
+        email.is_verified = True
+        return await self.save_email(email)
@@ -0,0 +1,48 @@
+from copy import copy
+
+from common.services.container import get_service
+from common.utils.cache import get_cache
+
+
+def _get_identity_cache(config):
+    return get_cache("identity", config.IDENTITY_CACHE_MAX_SIZE, config.IDENTITY_CACHE_TTL)
+
+
+def invalidate_identity(config, person_id):
+    """Drops the cached identity of a person, after their person or one of their emails was saved."""
+    _get_identity_cache(config).delete(person_id)
+
+
+class IdentityService:
+    """
+    Resolves the person and email of access tokens, caching them per person so repeated calls with a
+    token skip the database. The cache is local to the process: a person or email saved through another
+    worker is seen once the cached identity expires.
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+        from common.services import EmailService, PersonService
+        self.email_service = get_service(EmailService, config)
+        self.person_service = get_service(PersonService, config)
+
+        self.identity_cache = _get_identity_cache(config)
+
+    def get_identity(self, person_id, email_id):
+        """Get the person and email of an access token. Returns copies, which callers may change."""
+        cached = self.identity_cache.get(person_id)
+        if cached is not None and cached[0] == email_id:
+            _, person, email = cached
+            return copy(person), copy(email)
+
+        generation = self.identity_cache.generation
+        email = self.email_service.get_email_by_id(email_id)
+        person = self.person_service.get_person_by_id(person_id)
+        if person is not None and email is not None:
+            self.identity_cache.set(person_id, (email_id, copy(person), copy(email)), generation)
+        return person, email
+
+    def get_cache_stats(self):
+        """Get the hit, miss and eviction counters of the identity cache."""
+        return self.identity_cache.stats()
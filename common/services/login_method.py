@@ -1,4 +1,5 @@
 from common.repositories.factory import RepositoryFactory, RepoType
+from common.repositories.unit_of_work import UnitOfWork
 from common.models import LoginMethod
 from common.models.login_method import LoginMethodType
 
@@ -8,9 +9,11 @@ class LoginMethodService:
     def __init__(self, config):
         self.config = config
         self.repository_factory = RepositoryFactory(config)
-        self.login_method_repo = self.repository_factory.get_repository(RepoType.LOGIN_METHOD)
+        self.login_method_repo = self.repository_factory.get_repository(RepoType.LOGIN_METHOD, messaging=False)
 
-    def save_login_method(self, login_method: LoginMethod):
+    def save_login_method(self, login_method: LoginMethod, unit_of_work: UnitOfWork = None):
+        if unit_of_work:
+            return unit_of_work.save(self.login_method_repo, login_method)
         login_method = self.login_method_repo.save(login_method)
         return login_method
 
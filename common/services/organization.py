@@ -1,4 +1,5 @@
 from common.repositories.factory import RepositoryFactory, RepoType
+from common.repositories.unit_of_work import UnitOfWork
 from common.models import Organization
 
 
@@ -7,9 +8,11 @@ class OrganizationService:
     def __init__(self, config):
         self.config = config
         self.repository_factory = RepositoryFactory(config)
-        self.organization_repo = self.repository_factory.get_repository(RepoType.ORGANIZATION)
+        self.organization_repo = self.repository_factory.get_repository(RepoType.ORGANIZATION, messaging=False)
 
-    def save_organization(self, organization: Organization):
+    def save_organization(self, organization: Organization, unit_of_work: UnitOfWork = None):
+        if unit_of_work:
+            return unit_of_work.save(self.organization_repo, organization)
         organization = self.organization_repo.save(organization)
         return organization
 
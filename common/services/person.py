@@ -1,5 +1,9 @@
 from common.repositories.factory import RepositoryFactory, RepoType
+from common.repositories.unit_of_work import UnitOfWork
+from common.repositories.async_factory import AsyncRepositoryFactory
 from common.models.person import Person
+from common.services.container import get_service
+from common.services.identity import invalidate_identity
 
 
 class PersonService:
@@ -8,13 +12,17 @@ class PersonService:
         self.config = config
 
         from common.services import EmailService
-        self.email_service = EmailService(config)
+        self.email_service = get_service(EmailService, config)
 
         self.repository_factory = RepositoryFactory(config)
-        self.person_repo = self.repository_factory.get_repository(RepoType.PERSON)
+        self.person_repo = self.repository_factory.get_repository(RepoType.PERSON, messaging=False)
 
-    def save_person(self, person: Person):
-        person = self.person_repo.save(person)
+    def save_person(self, person: Person, unit_of_work: UnitOfWork = None):
+        if unit_of_work:
+            person = unit_of_work.save(self.person_repo, person)
+        else:
+            person = self.person_repo.save(person)
+        invalidate_identity(self.config, person.entity_id)
         return person
 
     def get_person_by_email_address(self, email_address: str):
@@ -27,4 +35,32 @@ class PersonService:
 
     def get_person_by_id(self, entity_id: str):
         person = self.person_repo.get_one({"entity_id": entity_id})
-        return person
\ No newline at end of file
+        return person
+
+
+class AsyncPersonService:
+
+    def __init__(self, config):
+        self.config = config
+
+        from common.services import AsyncEmailService
+        self.email_service = get_service(AsyncEmailService, config)
+
+        self.repository_factory = AsyncRepositoryFactory(config)
+        self.person_repo = self.repository_factory.get_repository(RepoType.PERSON)
+
+    async def save_person(self, person: Person):
+        person = await self.person_repo.save(person)
+        return person
+
+    async def get_person_by_email_address(self, email_address: str):
+        email_obj = await self.email_service.get_email_by_email_address(email_address)
+        if not email_obj:
+            return
+
+        person = await self.person_repo.get_one({"entity_id": email_obj.person_id})
+        return person
+
+    async def get_person_by_id(self, entity_id: str):
+        person = await self.person_repo.get_one({"entity_id": entity_id})
+        return person
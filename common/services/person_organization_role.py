@@ -1,4 +1,5 @@
 from common.repositories.factory import RepositoryFactory, RepoType
+from common.repositories.unit_of_work import UnitOfWork
 from common.models import PersonOrganizationRole
 
 
@@ -7,9 +8,11 @@ class PersonOrganizationRoleService:
     def __init__(self, config):
         self.config = config
         self.repository_factory = RepositoryFactory(config)
-        self.person_organization_role_repo = self.repository_factory.get_repository(RepoType.PERSON_ORGANIZATION_ROLE)
+        self.person_organization_role_repo = self.repository_factory.get_repository(RepoType.PERSON_ORGANIZATION_ROLE, messaging=False)
 
-    def save_person_organization_role(self, person_organization_role: PersonOrganizationRole):
+    def save_person_organization_role(self, person_organization_role: PersonOrganizationRole, unit_of_work: UnitOfWork = None):
+        if unit_of_work:
+            return unit_of_work.save(self.person_organization_role_repo, person_organization_role)
         person_organization_role = self.person_organization_role_repo.save(person_organization_role)
         return person_organization_role
 
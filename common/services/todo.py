@@ -1,71 +1,456 @@
+from copy import copy
+from datetime import datetime
+
 from common.repositories.factory import RepositoryFactory, RepoType
+from common.repositories.async_factory import AsyncRepositoryFactory
+from common.repositories.routing import stick_to_primary
 from common.models.todo import Todo
+from common.utils.cache import get_cache
+from common.utils.cursor import encode_cursor, decode_cursor
+from app.helpers.exceptions import InputValidationError, ConflictError
+
+
+def _get_completed_filter(filter_type):
+    """Maps a list filter to the `is_completed` value it selects, None for every todo."""
+    if filter_type in ["completed", "active"]:
+        return filter_type == "completed"
+    return None
+
+
+MAX_BATCH_SIZE = 1000
+MAX_TITLE_LENGTH = 255
+
+
+def _validate_titles(titles):
+    if not isinstance(titles, list) or not titles:
+        raise InputValidationError("'titles' must be a non-empty list.")
+    if len(titles) > MAX_BATCH_SIZE:
+        raise InputValidationError(f"At most {MAX_BATCH_SIZE} todos can be created at once.")
+    for title in titles:
+        if not isinstance(title, str) or not title.strip():
+            raise InputValidationError("Every title is required and cannot be empty.")
+        if len(title) > MAX_TITLE_LENGTH:
+            raise InputValidationError(f"Titles cannot be longer than {MAX_TITLE_LENGTH} characters.")
+    return titles
+
+
+def _decode_page_cursor(cursor):
+    if cursor is None:
+        return None
+    try:
+        position, entity_id = decode_cursor(cursor, 2)
+    except ValueError:
+        raise InputValidationError("Invalid cursor.")
+    return position, entity_id
+
+
+def _validate_search_text(text):
+    text = (text or "").strip()
+    if not text:
+        raise InputValidationError("'q' is required and cannot be empty.")
+    if len(text) > MAX_TITLE_LENGTH:
+        raise InputValidationError(f"'q' cannot be longer than {MAX_TITLE_LENGTH} characters.")
+    return text
+
+
+def _decode_search_cursor(cursor):
+    if cursor is None:
+        return None
+    try:
+        rank, entity_id = decode_cursor(cursor, 2)
+        return float(rank), entity_id
+    except (ValueError, TypeError):
+        raise InputValidationError("Invalid cursor.")
+
+
+def _get_search_result(results, limit):
+    """Splits ranked todos fetched with one extra row into the todos and the cursor of the next page."""
+    todos = [todo for todo, _ in results[:limit]]
+    if len(results) <= limit:
+        return todos, None
+    last_todo, last_rank = results[limit - 1]
+    return todos, encode_cursor(last_rank, last_todo.entity_id)
+
+
+def _decode_changes_cursor(cursor):
+    if cursor is None:
+        return None
+    try:
+        changed_on, entity_id = decode_cursor(cursor, 2)
+        return datetime.fromisoformat(changed_on), entity_id
+    except (ValueError, TypeError):
+        raise InputValidationError("Invalid cursor.")
+
+
+def _get_changes_result(todos, limit, cursor):
+    """Splits changed todos fetched with one extra row into the updated todos, the IDs of the deleted ones,
+    the cursor to read the following changes from, and whether more changes are already available."""
+    has_more = len(todos) > limit
+    todos = todos[:limit]
+    if todos:
+        cursor = encode_cursor(todos[-1].changed_on.isoformat(), todos[-1].entity_id)
+    updated_todos = [todo for todo in todos if todo.active]
+    deleted_ids = [todo.entity_id for todo in todos if not todo.active]
+    return updated_todos, deleted_ids, cursor, has_more
+
+
+def _get_next_page_cursor(todos, limit):
+    """Returns the cursor of the page after `todos`, fetched with one extra row, or None on the last page."""
+    if len(todos) <= limit:
+        return None
+    last_todo = todos[limit - 1]
+    return encode_cursor(last_todo.position, last_todo.entity_id)
+
+
+def _raise_update_failed(todo):
+    """Raises the error of a conditional update that matched nothing, given the todo as it currently is."""
+    if todo is None:
+        raise InputValidationError("Todo not found.")
+    raise ConflictError("Todo was changed since it was loaded.")
+
+
+def _get_todo_list_cache(config):
+    """Cache of the todo lists, keyed by person_id and `is_completed` filter. Shared by the sync and async
+    services, so a write made by either of them invalidates it."""
+    return get_cache("todo_list", config.TODO_CACHE_MAX_SIZE, config.TODO_CACHE_TTL)
+
+
+def _invalidate_todo_list(cache, person_id):
+    cache.delete(*((person_id, is_completed) for is_completed in (None, True, False)))
+
 
 class TodoListService:
    
     def __init__(self, config):
         self.config = config
         self.repository_factory = RepositoryFactory(config)
-        self.todo_repo = self.repository_factory.get_repository(RepoType.TODO)
+        self.todo_repo = self.repository_factory.get_repository(RepoType.TODO, messaging=False)
+        self.todo_list_cache = _get_todo_list_cache(config)
     
-    def get_todo_list_item(self, entity_id):
-        """Get a todo item by its ID."""
-        return self.todo_repo.get_one({"entity_id": entity_id})
+    def get_todo_list_item(self, person_id, entity_id):
+        """Get a todo item of the person by its ID, None when the person has no such todo."""
+        return self._get_owned_todo(person_id, entity_id)
         
-    def get_todo_list(self, person_id, filter_type="all"):
-        """Get todo list with optional filtering."""
-        filters = {"person_id": person_id, "active": True}
-        if filter_type in ["completed", "active"]:
-            filters["is_completed"] = (filter_type == "completed")
-        todos = self.todo_repo.get_many(filters)
-        return sorted(todos, key=lambda x: x.position)
+    def get_todo_list(self, person_id, filter_type="all", list_version=None):
+        """
+        Get todo list with optional filtering. Pass the `list_version` a response is tagged with, so a cached
+        list is only returned when it is of that version.
+        """
+        is_completed = _get_completed_filter(filter_type)
+        todos = self._get_cached_todo_list(person_id, is_completed, list_version)
+        if todos is None:
+            generation, list_version = self._start_todo_list_load(person_id)
+            todos = self.todo_repo.get_page(person_id, is_completed)
+            if len(todos) <= self.config.TODO_CACHE_MAX_LIST_SIZE:
+                self.todo_list_cache.set(
+                    (person_id, is_completed), (list_version, tuple(copy(todo) for todo in todos)), generation
+                )
+            return todos
+        return [copy(todo) for todo in todos]
+
+    def get_todo_list_version(self, person_id):
+        """Get a version of the todo list, which changes whenever any of its todos changes."""
+        return self.todo_repo.get_list_version(person_id)
+
+    def get_todo_summary(self, person_id):
+        """Get the number of todos, active todos and completed todos, and their revision."""
+        return self.todo_repo.get_summary(person_id)
+
+    def iter_todo_list(self, person_id, filter_type="all", list_version=None):
+        """Iterate over the todo list with optional filtering, without loading it whole. See `get_todo_list`."""
+        is_completed = _get_completed_filter(filter_type)
+        todos = self._get_cached_todo_list(person_id, is_completed, list_version)
+        if todos is None:
+            return self._iter_and_cache_todo_list(person_id, is_completed)
+        return (copy(todo) for todo in todos)
+
+    def _get_cached_todo_list(self, person_id, is_completed, list_version=None):
+        """Returns the cached todos of a list when they are of `list_version`, the current version without it."""
+        entry = self.todo_list_cache.get((person_id, is_completed))
+        if entry is None:
+            return None
+        if list_version is None:
+            list_version = self.get_todo_list_version(person_id)
+        cached_version, todos = entry
+        return todos if cached_version == list_version else None
+
+    def _start_todo_list_load(self, person_id):
+        """
+        Routes the reads of a list to cache to the primary, so a lagging replica is never cached, and reads its
+        version first: the todos read next are at least as recent, so the cached list is never older than the
+        version it is stored with. Returns the cache generation and the list version.
+        """
+        stick_to_primary()
+        generation = self.todo_list_cache.generation
+        return generation, self.get_todo_list_version(person_id)
+
+    def _iter_and_cache_todo_list(self, person_id, is_completed):
+        """Streams the todo list from the database, caching it at the end if it is small enough."""
+        generation, list_version = self._start_todo_list_load(person_id)
+        todos = []
+        for todo in self.todo_repo.iter_page(person_id, is_completed):
+            if todos is not None and len(todos) < self.config.TODO_CACHE_MAX_LIST_SIZE:
+                todos.append(copy(todo))
+            else:
+                todos = None
+            yield todo
+
+        if todos is not None:
+            self.todo_list_cache.set((person_id, is_completed), (list_version, tuple(todos)), generation)
+
+    def get_todo_changes(self, person_id, since=None, limit=200):
+        """
+        Get the todos changed since the cursor of a previous call, from the start without it. Returns the
+        updated todos, the IDs of the deleted ones, the cursor of the next call, and whether more changes
+        are already available.
+        """
+        todos = self.todo_repo.get_changes(
+            person_id, _decode_changes_cursor(since), limit + 1, self.config.TODO_CHANGES_DELAY
+        )
+        return _get_changes_result(todos, limit, since)
+
+    def get_cache_stats(self):
+        """Get the hit, miss and eviction counters of the todo list cache."""
+        return self.todo_list_cache.stats()
+
+    def get_todo_page(self, person_id, filter_type="all", limit=50, cursor=None):
+        """Get one page of the todo list. Returns the todos and the cursor of the next page."""
+        todos = self.todo_repo.get_page(
+            person_id, _get_completed_filter(filter_type), _decode_page_cursor(cursor), limit + 1
+        )
+        return todos[:limit], _get_next_page_cursor(todos, limit)
+
+    def search_todo_list(self, person_id, text, limit=50, cursor=None):
+        """Search the todo list for titles containing `text`. Returns the best matches first, and the cursor of the
+        next page."""
+        results = self.todo_repo.search(
+            person_id, _validate_search_text(text), _decode_search_cursor(cursor), limit + 1
+        )
+        return _get_search_result(results, limit)
 
     def create_todo_list_item(self, person_id, title):
-        """Create a new todo item."""
-        todos = self.get_todo_list(person_id, "all")
-        todos = sorted(todos, key=lambda x: x.position)
-        
-        for todo in todos:
-            todo.position += 1
-            self.todo_repo.save(todo)
-        
+        """Create a new todo item at the top of the list."""
         todo = Todo(
             person_id=person_id, 
             title=title,
             position=0  
         )
         todo.prepare_for_save(changed_by_id=person_id)
-        return self.todo_repo.save(todo)
+        todo = self.todo_repo.insert_at_top(todo)
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return todo
+
+    def create_todo_list_items(self, person_id, titles):
+        """Create new todo items at the top of the list, in the order of the given titles."""
+        todos = [Todo(person_id=person_id, title=title) for title in _validate_titles(titles)]
+        for todo in todos:
+            todo.prepare_for_save(changed_by_id=person_id)
+        todos = self.todo_repo.insert_many_at_top(todos)
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return todos
+
+    def move_todo_list_item(self, person_id, entity_id, after_id=None):
+        """Move a todo item right after another one, or to the top of the list."""
+        todo = self._get_owned_todo(person_id, entity_id)
+        if not todo or after_id == entity_id:
+            raise InputValidationError("Todo not found.")
+
+        moved_todo = self.todo_repo.move(todo, after_id, changed_by_id=person_id)
+        if not moved_todo:
+            raise InputValidationError("Todo to move after not found.")
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return moved_todo
+
+    def reorder_todo_list(self, person_id, todo_ids):
+        """Reorder todo items in the order of the given IDs. Returns the number of todos moved."""
+        moved_count = self.todo_repo.reorder(person_id, todo_ids)
+        if moved_count is None:
+            raise InputValidationError("Todo not found.")
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return moved_count
 
-    def update_todo_list_item(self, entity_id, title, is_completed, position=None):
-        """Update a todo item."""
-        todo = self.get_todo_list_item(entity_id)
-        todo.title = title
-        todo.is_completed = is_completed
+    def _get_owned_todo(self, person_id, entity_id):
+        return self.todo_repo.get_one({"entity_id": entity_id, "person_id": person_id})
+
+    def update_todo_list_item(self, person_id, entity_id, title, is_completed, position=None, version=None):
+        """
+        Update a todo item. With `version`, the todo is only updated if it is still at that version,
+        otherwise a ConflictError is raised.
+        """
+        values = dict(title=title, is_completed=is_completed)
         if position is not None:
-            todo.position = position
-        return self.todo_repo.save(todo)
+            values["position"] = position
+        todo = self.todo_repo.update_fields(person_id, entity_id, values, version, changed_by_id=person_id)
+        if not todo:
+            _raise_update_failed(self._get_owned_todo(person_id, entity_id))
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return todo
 
-    def update_todo_list_item_status(self, entity_id):
-        """Update completion status of a todo item."""
-        todo = self.get_todo_list_item(entity_id)
-        todo.is_completed = not todo.is_completed
-        return self.todo_repo.save(todo)
+    def update_todo_list_item_status(self, person_id, entity_id, version=None):
+        """Update completion status of a todo item, see `update_todo_list_item`."""
+        todo = self.todo_repo.toggle_completed(person_id, entity_id, version, changed_by_id=person_id)
+        if not todo:
+            _raise_update_failed(self._get_owned_todo(person_id, entity_id))
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return todo
 
     def mark_all_todo_list(self, person_id, status):
-        """Mark all todo items as completed or active."""
-        todos = self.get_todo_list(person_id, "active" if status == "completed" else "completed")
-        for todo in todos:
-            todo.is_completed = (status == "completed")
-            self.todo_repo.save(todo)
-            
-    def delete_todo_list_item(self, todo_id):
-        """Delete a todo item."""
-        todo = self.get_todo_list_item(todo_id)
-        self.todo_repo.delete(todo)
+        """Mark all todo items as completed or active. Returns the number of todos updated."""
+        updated_count = self.todo_repo.set_completed(person_id, status == "completed", changed_by_id=person_id)
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return updated_count
+
+    def delete_todo_list_item(self, person_id, todo_id, version=None):
+        """Delete a todo item, see `update_todo_list_item`."""
+        todo = self.todo_repo.delete_one(person_id, todo_id, version, changed_by_id=person_id)
+        if not todo:
+            _raise_update_failed(self._get_owned_todo(person_id, todo_id))
+        _invalidate_todo_list(self.todo_list_cache, person_id)
 
     def delete_completed_todo_list(self, person_id):
-        """Delete all completed todo items."""
-        completed_todos = self.get_todo_list(person_id, "completed")
-        for todo in completed_todos:
-            self.todo_repo.delete(todo)
\ No newline at end of file
+        """Delete all completed todo items. Returns the number of todos deleted."""
+        deleted_count = self.todo_repo.delete_completed(person_id, changed_by_id=person_id)
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return deleted_count
+
+
+class AsyncTodoListService:
+
+    def __init__(self, config):
+        self.config = config
+        self.repository_factory = AsyncRepositoryFactory(config)
+        self.todo_repo = self.repository_factory.get_repository(RepoType.TODO)
+        self.todo_list_cache = _get_todo_list_cache(config)
+
+    async def get_todo_list_item(self, person_id, entity_id):
+        """Get a todo item of the person by its ID, None when the person has no such todo."""
+        return await self._get_owned_todo(person_id, entity_id)
+
+    async def get_todo_list(self, person_id, filter_type="all"):
+        """Get todo list with optional filtering."""
+        return await self.todo_repo.get_page(person_id, _get_completed_filter(filter_type))
+
+    async def get_todo_list_version(self, person_id):
+        """Get a version of the todo list, which changes whenever any of its todos changes."""
+        return await self.todo_repo.get_list_version(person_id)
+
+    async def get_todo_summary(self, person_id):
+        """Get the number of todos, active todos and completed todos, and their revision."""
+        return await self.todo_repo.get_summary(person_id)
+
+    def iter_todo_list(self, person_id, filter_type="all"):
+        """Iterate over the todo list with optional filtering, without loading it whole."""
+        return self.todo_repo.iter_page(person_id, _get_completed_filter(filter_type))
+
+    async def get_todo_changes(self, person_id, since=None, limit=200):
+        """
+        Get the todos changed since the cursor of a previous call, from the start without it. Returns the
+        updated todos, the IDs of the deleted ones, the cursor of the next call, and whether more changes
+        are already available.
+        """
+        todos = await self.todo_repo.get_changes(
+            person_id, _decode_changes_cursor(since), limit + 1, self.config.TODO_CHANGES_DELAY
+        )
+        return _get_changes_result(todos, limit, since)
+
+    async def get_todo_page(self, person_id, filter_type="all", limit=50, cursor=None):
+        """Get one page of the todo list. Returns the todos and the cursor of the next page."""
+        todos = await self.todo_repo.get_page(
+            person_id, _get_completed_filter(filter_type), _decode_page_cursor(cursor), limit + 1
+        )
+        return todos[:limit], _get_next_page_cursor(todos, limit)
+
+    async def search_todo_list(self, person_id, text, limit=50, cursor=None):
+        """Search the todo list for titles containing `text`. Returns the best matches first, and the cursor of the
+        next page."""
+        results = await self.todo_repo.search(
+            person_id, _validate_search_text(text), _decode_search_cursor(cursor), limit + 1
+        )
+        return _get_search_result(results, limit)
+
+    async def create_todo_list_item(self, person_id, title):
+        """Create a new todo item at the top of the list."""
+        todo = Todo(
+            person_id=person_id,
+            title=title,
+            position=0
+        )
+        todo.prepare_for_save(changed_by_id=person_id)
+        todo = await self.todo_repo.insert_at_top(todo)
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return todo
+
+    async def create_todo_list_items(self, person_id, titles):
+        """Create new todo items at the top of the list, in the order of the given titles."""
+        todos = [Todo(person_id=person_id, title=title) for title in _validate_titles(titles)]
+        for todo in todos:
+            todo.prepare_for_save(changed_by_id=person_id)
+        todos = await self.todo_repo.insert_many_at_top(todos)
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return todos
+
+    async def move_todo_list_item(self, person_id, entity_id, after_id=None):
+        """Move a todo item right after another one, or to the top of the list."""
+        todo = await self._get_owned_todo(person_id, entity_id)
+        if not todo or after_id == entity_id:
+            raise InputValidationError("Todo not found.")
+
+        moved_todo = await self.todo_repo.move(todo, after_id, changed_by_id=person_id)
+        if not moved_todo:
+            raise InputValidationError("Todo to move after not found.")
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return moved_todo
+
+    async def reorder_todo_list(self, person_id, todo_ids):
+        """Reorder todo items in the order of the given IDs. Returns the number of todos moved."""
+        moved_count = await self.todo_repo.reorder(person_id, todo_ids)
+        if moved_count is None:
+            raise InputValidationError("Todo not found.")
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return moved_count
+
+    async def _get_owned_todo(self, person_id, entity_id):
+        return await self.todo_repo.get_one({"entity_id": entity_id, "person_id": person_id})
+
+    async def update_todo_list_item(self, person_id, entity_id, title, is_completed, position=None, version=None):
+        """
+        Update a todo item. With `version`, the todo is only updated if it is still at that version,
+        otherwise a ConflictError is raised.
+        """
+        values = dict(title=title, is_completed=is_completed)
+        if position is not None:
+            values["position"] = position
+        todo = await self.todo_repo.update_fields(person_id, entity_id, values, version, changed_by_id=person_id)
+        if not todo:
+            _raise_update_failed(await self._get_owned_todo(person_id, entity_id))
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return todo
+
+    async def update_todo_list_item_status(self, person_id, entity_id, version=None):
+        """Update completion status of a todo item, see `update_todo_list_item`."""
+        todo = await self.todo_repo.toggle_completed(person_id, entity_id, version, changed_by_id=person_id)
+        if not todo:
+            _raise_update_failed(await self._get_owned_todo(person_id, entity_id))
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return todo
+
+    async def mark_all_todo_list(self, person_id, status):
+        """Mark all todo items as completed or active. Returns the number of todos updated."""
+        updated_count = await self.todo_repo.set_completed(
+            person_id, status == "completed", changed_by_id=person_id
+        )
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return updated_count
+
+    async def delete_todo_list_item(self, person_id, todo_id, version=None):
+        """Delete a todo item, see `update_todo_list_item`."""
+        todo = await self.todo_repo.delete_one(person_id, todo_id, version, changed_by_id=person_id)
+        if not todo:
+            _raise_update_failed(await self._get_owned_todo(person_id, todo_id))
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+
+    async def delete_completed_todo_list(self, person_id):
+        """Delete all completed todo items. Returns the number of todos deleted."""
+        deleted_count = await self.todo_repo.delete_completed(person_id, changed_by_id=person_id)
+        _invalidate_todo_list(self.todo_list_cache, person_id)
+        return deleted_count
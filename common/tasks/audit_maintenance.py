@@ -0,0 +1,197 @@
+"""
+Maintenance of the audit tables, which are partitioned by month of `changed_on` since migration 0000000011.
+Run it daily, e.g. from cron:
+
+    python -m common.tasks.audit_maintenance
+"""
+from datetime import date, datetime, timedelta
+from typing import List
+
+from common.app_config import config
+from common.app_logger import logger
+
+AUDIT_TABLES = [
+    "organization_audit",
+    "person_audit",
+    "email_audit",
+    "login_method_audit",
+    "person_organization_role_audit",
+    "todo_audit",
+]
+
+# Columns that may differ between two todo versions for the older one to be compacted away
+POSITION_ONLY_COLUMNS = ["version", "previous_version", "changed_on", "changed_by_id", "position"]
+
+
+def _add_months(month: date, months: int) -> date:
+    month_index = month.year * 12 + month.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _get_partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:y%Ym%m}"
+
+
+def _get_partition_month(table: str, partition: str):
+    try:
+        return datetime.strptime(partition[len(table) + 1:], "y%Ym%m").date()
+    except ValueError:
+        return None
+
+
+def _get_partitions(adapter, table: str) -> List[str]:
+    rows = adapter.execute_query(
+        "SELECT inhrelid::regclass::text AS name FROM pg_inherits WHERE inhparent = %s::regclass", (table,)
+    )
+    return [row["name"] for row in rows]
+
+
+def create_audit_partitions(adapter, months_ahead: int = 3) -> List[str]:
+    """
+    Creates the monthly partitions of every audit table up to `months_ahead` months past the current one.
+    Rows of the new months that already landed in the default partition are moved to their partition.
+    Returns the names of the created partitions.
+    """
+    current_month = datetime.utcnow().date().replace(day=1)
+    created = []
+    for table in AUDIT_TABLES:
+        with adapter:
+            partitions = set(_get_partitions(adapter, table))
+            for months in range(months_ahead + 1):
+                month = _add_months(current_month, months)
+                partition = _get_partition_name(table, month)
+                if partition in partitions:
+                    continue
+
+                bounds = (month, _add_months(month, 1))
+                adapter.run_transaction([
+                    f"CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS)",
+                    (
+                        f"WITH moved AS ("
+                        f"DELETE FROM {table}_default WHERE changed_on >= %s AND changed_on < %s RETURNING *"
+                        f") INSERT INTO {partition} SELECT * FROM moved",
+                        bounds
+                    ),
+                    (f"ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES FROM (%s) TO (%s)", bounds),
+                ])
+                created.append(partition)
+    return created
+
+
+def drop_expired_audit_partitions(adapter, retention_days: int) -> List[str]:
+    """
+    Drops the monthly partitions of every audit table that only hold versions older than `retention_days`
+    days, and deletes the expired versions of the default partitions. Returns the names of the dropped
+    partitions.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    dropped = []
+    for table in AUDIT_TABLES:
+        with adapter:
+            for partition in _get_partitions(adapter, table):
+                month = _get_partition_month(table, partition)
+                if month is None or datetime.combine(_add_months(month, 1), datetime.min.time()) > cutoff:
+                    continue
+                adapter.run_transaction([f"DROP TABLE {partition}"])
+                dropped.append(partition)
+
+            adapter.run_transaction([(f"DELETE FROM {table}_default WHERE changed_on < %s", (cutoff,))])
+    return dropped
+
+
+def _get_plan_todo_audit_compaction_query():
+    """
+    Returns a query finding, in a single pass over `todo_audit`, every run of consecutive todo versions that
+    only differ by their position, e.g. from reorders, into the temporary table `todo_audit_compaction`. Every
+    version of a run but the last is marked `is_redundant`; the last one gets the `previous_version` of the
+    first one, so the chain of versions stays connected once the others are removed.
+    """
+    query = (
+        "CREATE TEMPORARY TABLE todo_audit_compaction AS "
+        "WITH versions AS ("
+        "SELECT entity_id, version, changed_on, previous_version, to_jsonb(todo_audit) - %s::text[] AS vals "
+        "FROM todo_audit"
+        "), linked AS ("
+        "SELECT *, "
+        "COALESCE(previous_version = lag(version) OVER chain AND vals = lag(vals) OVER chain, false) "
+        "AS continues_run, "
+        "COALESCE(lead(previous_version) OVER chain = version AND lead(vals) OVER chain = vals, false) "
+        "AS is_redundant "
+        "FROM versions WINDOW chain AS (PARTITION BY entity_id ORDER BY changed_on, version)"
+        "), runs AS ("
+        "SELECT *, count(*) FILTER (WHERE NOT continues_run) "
+        "OVER (PARTITION BY entity_id ORDER BY changed_on, version) AS run "
+        "FROM linked"
+        "), planned AS ("
+        "SELECT *, first_value(previous_version) "
+        "OVER (PARTITION BY entity_id, run ORDER BY changed_on, version) AS run_previous_version "
+        "FROM runs"
+        ") "
+        "SELECT entity_id, version, changed_on, is_redundant, run_previous_version AS previous_version "
+        "FROM planned WHERE is_redundant OR continues_run"
+    )
+    return query, (POSITION_ONLY_COLUMNS,)
+
+
+def _get_compact_todo_audit_query(batch_size: int):
+    """
+    Returns a query applying up to `batch_size` rows of the plan of `_get_plan_todo_audit_compaction_query`:
+    redundant versions are deleted by key and the last versions of their runs relinked. Returns the number of
+    applied and deleted rows.
+    """
+    keys = (
+        "todo_audit.entity_id = batch.entity_id AND todo_audit.version = batch.version "
+        "AND todo_audit.changed_on = batch.changed_on"
+    )
+    query = (
+        f"WITH batch AS ("
+        f"DELETE FROM todo_audit_compaction WHERE ctid IN (SELECT ctid FROM todo_audit_compaction LIMIT %s) "
+        f"RETURNING *"
+        f"), deleted AS ("
+        f"DELETE FROM todo_audit USING batch WHERE batch.is_redundant AND {keys} RETURNING 1"
+        f"), relinked AS ("
+        f"UPDATE todo_audit SET previous_version = batch.previous_version FROM batch "
+        f"WHERE NOT batch.is_redundant AND {keys} RETURNING 1"
+        f") "
+        f"SELECT (SELECT count(*) FROM batch) AS applied, (SELECT count(*) FROM deleted) AS deleted"
+    )
+    return query, (batch_size,)
+
+
+def compact_todo_audit(adapter, batch_size: int = 10000) -> int:
+    """
+    Collapses every run of todo versions that only differ by their position into its last version, finding
+    them in one pass and removing them `batch_size` at a time. Returns the number of removed versions.
+    """
+    compacted = 0
+    with adapter:
+        adapter.run_transaction(["DROP TABLE IF EXISTS todo_audit_compaction"])
+        try:
+            adapter.run_transaction([_get_plan_todo_audit_compaction_query()])
+            while True:
+                row, = adapter.execute_returning_query(*_get_compact_todo_audit_query(batch_size))
+                if not row["applied"]:
+                    return compacted
+                compacted += row["deleted"]
+        finally:
+            adapter.run_transaction(["DROP TABLE IF EXISTS todo_audit_compaction"])
+
+
+def run_audit_maintenance(adapter=None):
+    if adapter is None:
+        from common.repositories.factory import RepositoryFactory
+        adapter = RepositoryFactory(config).get_db_connection()
+
+    created = create_audit_partitions(adapter, config.AUDIT_PARTITIONS_AHEAD)
+    logger.info(f"Created {len(created)} audit partitions: {', '.join(created)}")
+
+    if config.AUDIT_RETENTION_DAYS:
+        dropped = drop_expired_audit_partitions(adapter, config.AUDIT_RETENTION_DAYS)
+        logger.info(f"Dropped {len(dropped)} expired audit partitions: {', '.join(dropped)}")
+
+    compacted = compact_todo_audit(adapter)
+    logger.info(f"Compacted {compacted} position-only todo versions")
+
+
+if __name__ == "__main__":
+    run_audit_maintenance()
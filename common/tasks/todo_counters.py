@@ -0,0 +1,77 @@
+"""
+Repair of the todo counters of migration 0000000012, which the triggers of `todo` keep up to date. Run it after
+restoring data or writing to `todo` with the triggers disabled:
+
+    python -m common.tasks.todo_counters
+"""
+from typing import List
+
+from common.app_config import config
+from common.app_logger import logger
+
+
+def _get_person_ids_query(after: str, batch_size: int):
+    query = "SELECT DISTINCT person_id FROM todo WHERE person_id > %s ORDER BY person_id LIMIT %s"
+    return query, (after, batch_size)
+
+
+def _get_lock_counters_query(person_ids: List[str]):
+    # Writes of the batch either committed before the counts are read, or wait to update the counters after
+    query = "SELECT person_id FROM todo_counter WHERE person_id = ANY(%s) ORDER BY person_id FOR UPDATE"
+    return query, (person_ids,)
+
+
+def _get_repair_counters_query(person_ids: List[str]):
+    query = (
+        "INSERT INTO todo_counter AS counter (person_id, total_count, active_count, completed_count, revision) "
+        "SELECT person_id, "
+        "count(*) FILTER (WHERE active), "
+        "count(*) FILTER (WHERE active AND NOT is_completed), "
+        "count(*) FILTER (WHERE active AND is_completed), "
+        "1 "
+        "FROM todo WHERE person_id = ANY(%s) GROUP BY person_id "
+        "ON CONFLICT (person_id) DO UPDATE SET "
+        "total_count = EXCLUDED.total_count, "
+        "active_count = EXCLUDED.active_count, "
+        "completed_count = EXCLUDED.completed_count, "
+        "revision = counter.revision + 1 "
+        "WHERE (counter.total_count, counter.active_count, counter.completed_count) "
+        "IS DISTINCT FROM (EXCLUDED.total_count, EXCLUDED.active_count, EXCLUDED.completed_count)"
+    )
+    return query, (person_ids,)
+
+
+def repair_todo_counters(adapter, batch_size: int = 1000) -> int:
+    """
+    Recomputes the counters of every person with todos, `batch_size` people per transaction. Returns the number
+    of counters that were wrong or missing.
+    """
+    repaired = 0
+    after = ""
+    while True:
+        with adapter:
+            rows = adapter.execute_query(*_get_person_ids_query(after, batch_size))
+        if not rows:
+            return repaired
+
+        person_ids = [row["person_id"] for row in rows]
+        with adapter:
+            _, row_count = adapter.run_transaction([
+                _get_lock_counters_query(person_ids),
+                _get_repair_counters_query(person_ids),
+            ])
+        repaired += row_count
+        after = person_ids[-1]
+
+
+def run_todo_counters_repair(adapter=None):
+    if adapter is None:
+        from common.repositories.factory import RepositoryFactory
+        adapter = RepositoryFactory(config).get_db_connection()
+
+    repaired = repair_todo_counters(adapter)
+    logger.info(f"Repaired {repaired} todo counters")
+
+
+if __name__ == "__main__":
+    run_todo_counters_repair()
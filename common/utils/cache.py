@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+from common.app_logger import logger
+
+_caches = {}
+_caches_lock = threading.Lock()
+_stats_logged_at = None
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache, bounded by its number of entries, evicting the least recently used
+    entry first. Entries also expire `ttl` seconds after they were stored.
+
+    The cache is local to the process: with several workers, an entry invalidated in one of them stays
+    in the others until it expires.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def generation(self) -> int:
+        """Number of invalidations so far. Read it before loading a value to store it with `set`."""
+        return self._generation
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, generation: int = None) -> bool:
+        """
+        Stores a value. With `generation`, the value is only stored when nothing was invalidated since that
+        generation, so a value loaded before a concurrent write is not cached. Returns whether it was stored.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+
+            self._entries[key] = (value, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def delete(self, *keys: Hashable):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return dict(
+                size=len(self._entries), max_size=self.max_size, hits=self.hits, misses=self.misses,
+                hit_rate=self.hits / lookups if lookups else 0.0, evictions=self.evictions,
+                expirations=self.expirations
+            )
+
+
+def get_cache(name: str, max_size: int = 1024, ttl: float = 60) -> TTLCache:
+    """Returns the process-wide cache called `name`, creating it on first use."""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = TTLCache(max_size, ttl)
+        return cache
+
+
+def get_cache_stats() -> Dict[str, Dict[str, float]]:
+    """Returns the counters of every cache created with `get_cache`, by name."""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+def log_cache_stats(interval: float, clock: Callable[[], float] = time.monotonic) -> bool:
+    """
+    Logs the counters of every cache, at most once every `interval` seconds, and returns whether it did.
+    Caches are local to the process, so every worker logs its own.
+    """
+    global _stats_logged_at
+    if interval <= 0:
+        return False
+
+    now = clock()
+    with _caches_lock:
+        if _stats_logged_at is not None and now - _stats_logged_at < interval:
+            return False
+        _stats_logged_at = now
+
+    for name, stats in get_cache_stats().items():
+        logger.info(
+            f"Cache {name}: hit rate {stats['hit_rate']:.1%}, {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['size']}/{stats['max_size']} entries, {stats['evictions']} evictions, "
+            f"{stats['expirations']} expirations"
+        )
+    return True
@@ -0,0 +1,20 @@
+import base64
+import json
+
+
+def encode_cursor(*values) -> str:
+    """Encodes the sort key of the last row of a page as an opaque, url-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode('utf-8')).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decodes a cursor made by `encode_cursor` with `size` values. Raises ValueError when it is malformed."""
+    try:
+        padded_cursor = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded_cursor.encode('ascii')))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
@@ -6,9 +6,10 @@ from flask_cors import CORS
 from rococo.plugins.pooled_connection import PooledConnectionPlugin
 from rococo.models.versioned_model import ModelValidationError
 
-from app.helpers.exceptions import InputValidationError, APIException
+from app.helpers.exceptions import InputValidationError, APIException, ConflictError
 
 from common.app_config import get_config
+from common.utils.cache import log_cache_stats
 from common.utils.version import get_service_version, get_project_name
 from logger import set_request_exception_signal, logger
 
@@ -44,6 +45,11 @@ def create_app():
 
     PooledConnectionPlugin(app, database_type="postgres")
 
+    @app.after_request
+    def log_cache_stats_periodically(response):
+        log_cache_stats(config.CACHE_STATS_LOG_INTERVAL)
+        return response
+
     @app.route('/')
     def hello_world():
         return 'Welcome to Rococo Sample API.'
@@ -61,6 +67,16 @@ def create_app():
         return get_failure_response(message=str(exception))
 
 
+    # Registered on the API, so resources answer with a 409 instead of an internal server error
+    @api.errorhandler(ConflictError)
+    def handle_conflict_error(exception):
+        return dict(success=False, message=str(exception)), 409
+
+    # Likewise, invalid input raised by resources is a 400
+    @api.errorhandler(InputValidationError)
+    def handle_api_input_validation_error(exception):
+        return dict(success=False, message=str(exception)), 400
+
     @app.errorhandler(APIException)
     def handle_application_error(exception):
         # Handle your custom exception here
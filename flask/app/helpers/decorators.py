@@ -2,29 +2,43 @@ from functools import wraps
 from flask import request
 from flask import g, abort
 
+from app.helpers.identity import LazyModel
 from app.helpers.response import get_failure_response
 from inspect import signature
 from common.app_logger import logger
 from common.app_config import config
 
-from common.services.email import EmailService
-from common.services.person import PersonService
 from common.services.auth import AuthService
 from common.services.auth import AuthService
+from common.services.identity import IdentityService
 from common.services import OrganizationService, PersonOrganizationRoleService
+from common.services.container import get_service
 
 
 
+def _get_identity_loader(person_id, email_id):
+    """Returns a function fetching the person and email of a token on its first call, and reusing them after."""
+    identity = []
+
+    def load_identity():
+        if not identity:
+            identity.extend(get_service(IdentityService, config).get_identity(person_id, email_id))
+        return identity
+
+    return load_identity
+
+
 def login_required():
     def decorator(func):
+        # handle arguments based on the function parameters
+        func_params = signature(func).parameters
+
         @wraps(func)
         def wrapper(self, *args, **kwargs):
             if 'Authorization' not in request.headers:
                 return get_failure_response(message="Authorization header not present", status_code=401)
             
-            auth_service = AuthService(config)
-            email_service = EmailService(config)
-            person_service = PersonService(config)
+            auth_service = get_service(AuthService, config)
 
             data = request.headers['Authorization']
             token = str.replace(str(data), 'Bearer ', '')
@@ -37,8 +51,10 @@ def login_required():
                 person_id = parsed_token.get('person_id')
                 email_id = parsed_token.get('email_id')
 
-                email = email_service.get_email_by_id(email_id)
-                person = person_service.get_person_by_id(person_id)
+                # The person and email are only fetched when a view uses more than the IDs of the token
+                load_identity = _get_identity_loader(person_id, email_id)
+                person = LazyModel(lambda: load_identity()[0], entity_id=person_id)
+                email = LazyModel(lambda: load_identity()[1], entity_id=email_id, person_id=person_id)
 
                 g.person = person
                 g.email = email
@@ -47,8 +63,6 @@ def login_required():
                 logger.exception(e)
                 abort(500)
 
-            # handle arguments based on the function parameters
-            func_params = signature(func).parameters
             extra_args = {}
 
             if 'person' in func_params:
@@ -66,6 +80,9 @@ def login_required():
 
 def organization_required(with_roles=None):
     def decorator(func):
+        # handle arguments based on the function parameters
+        func_params = signature(func).parameters
+
         @wraps(func)
         def wrapper(self, *args, **kwargs):
             if 'x-organization-id' not in request.headers:
@@ -76,8 +93,8 @@ def organization_required(with_roles=None):
             if not person:
                 raise Exception("organization_required decorator should be used after login_required decorator.")
 
-            organization_service = OrganizationService(config)
-            person_organization_role_service = PersonOrganizationRoleService(config)
+            organization_service = get_service(OrganizationService, config)
+            person_organization_role_service = get_service(PersonOrganizationRoleService, config)
 
             organization_id = request.headers['x-organization-id']
             organization = organization_service.get_organization_by_id(organization_id)
@@ -102,8 +119,6 @@ def organization_required(with_roles=None):
             g.role = person_organization_role
             g.organization = organization
 
-            # handle arguments based on the function parameters
-            func_params = signature(func).parameters
             extra_args = {}
             if 'role' in func_params:
                 extra_args['role'] = person_organization_role
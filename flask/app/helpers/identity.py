@@ -0,0 +1,39 @@
+from typing import Any, Callable
+
+
+class LazyModel:
+    """
+    Stands in for a model of the current identity. The fields known from the access token are available
+    right away, and the model is only fetched, once, when any other attribute is used. Use `resolve()`
+    to get the model itself, e.g. to save it or to serialize it.
+    """
+
+    __slots__ = ('_loader', '_claims', '_instance', '_loaded')
+
+    def __init__(self, loader: Callable[[], Any], **claims):
+        object.__setattr__(self, '_loader', loader)
+        object.__setattr__(self, '_claims', claims)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_loaded', False)
+
+    def resolve(self):
+        """Returns the model, fetching it on first use. Returns None when it no longer exists."""
+        if not self._loaded:
+            object.__setattr__(self, '_instance', self._loader())
+            object.__setattr__(self, '_loaded', True)
+        return self._instance
+
+    def __getattr__(self, name):
+        claims = object.__getattribute__(self, '_claims')
+        if name in claims:
+            return claims[name]
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.resolve(), name, value)
+        if name in self._claims:
+            self._claims[name] = value
+
+    def __repr__(self):
+        state = repr(self._instance) if self._loaded else f"unloaded, {self._claims}"
+        return f"<{type(self).__name__} {state}>"
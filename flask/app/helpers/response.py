@@ -1,4 +1,6 @@
-from flask import current_app as app
+import hashlib
+
+from flask import current_app as app, request, stream_with_context
 from app.helpers.exceptions import InputValidationError
 
 
@@ -30,6 +32,52 @@ def get_failure_response(message, status_code=200):
     return response
 
 
-def get_success_response(status_code=200, **data):
+def get_success_response(status_code=200, etag=None, **data):
     response = _get_response(dict(success=True, **data), status_code)
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+def make_etag(*parts):
+    """Builds a strong ETag from the versions a response depends on."""
+    return hashlib.md5("\n".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def is_not_modified(etag):
+    """Checks whether the client already has the response with this ETag, from its If-None-Match header."""
+    return request.if_none_match.contains(etag)
+
+
+def get_not_modified_response(etag):
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def _generate_json_envelope(data, items_key, items, chunk_size):
+    envelope = app.json.dumps(data)
+    yield f"{envelope[:-1]}{', ' if data else ''}{app.json.dumps(items_key)}: ["
+
+    chunk = []
+    for index, item in enumerate(items):
+        chunk.append(("," if index else "") + app.json.dumps(item))
+        if len(chunk) >= chunk_size:
+            yield "".join(chunk)
+            chunk = []
+    yield "".join(chunk) + "]}"
+
+
+def get_streaming_success_response(items_key, items, status_code=200, chunk_size=100, etag=None, **data):
+    """
+    Streams the response of `get_success_response`, with the `items_key` list serialized while `items` is
+    consumed, `chunk_size` items at a time. The response is sent with chunked transfer encoding.
+    """
+    response = app.response_class(
+        response=stream_with_context(_generate_json_envelope(dict(success=True, **data), items_key, items, chunk_size)),
+        status=status_code,
+        mimetype=app.config['MIME_TYPE']
+    )
+    if etag:
+        response.set_etag(etag)
     return response
@@ -3,9 +3,7 @@ down_revision = "0000000006"
 
 def upgrade(migration):
     # Update positions for existing todos
-    migration.alter_table(
-        "todo",
-        """
+    migration.execute("""
         UPDATE todo t
         SET position = subquery.new_position
         FROM (
@@ -19,9 +17,7 @@ def upgrade(migration):
     )
 
     # Update audit table to match
-    migration.alter_table(
-        "todo_audit",
-        """
+    migration.execute("""
         UPDATE todo_audit t
         SET position = subquery.new_position
         FROM (
@@ -38,7 +34,7 @@ def upgrade(migration):
 
 def downgrade(migration):
     # Reset positions to 0 in both tables
-    migration.alter_table("todo", 'UPDATE todo SET position = 0')
-    migration.alter_table("todo_audit", 'UPDATE todo_audit SET position = 0')
+    migration.execute('UPDATE todo SET position = 0')
+    migration.execute('UPDATE todo_audit SET position = 0')
     
     migration.update_version_table(version=down_revision) 
\ No newline at end of file
@@ -0,0 +1,49 @@
+revision = "0000000008"
+down_revision = "0000000007"
+
+POSITION_GAP = 1024
+
+
+def upgrade(migration):
+    # Spaced positions leave room to insert or move a todo without renumbering its neighbours
+    migration.alter_column("todo", "position", "bigint")
+    migration.alter_column("todo_audit", "position", "bigint")
+
+    migration.execute(
+        f"""
+        UPDATE todo t
+        SET position = subquery.new_position
+        FROM (
+            SELECT entity_id,
+                   ROW_NUMBER() OVER (PARTITION BY person_id ORDER BY position, created_on) * {POSITION_GAP} as new_position
+            FROM todo
+            WHERE active = true
+        ) AS subquery
+        WHERE t.entity_id = subquery.entity_id
+        """
+    )
+
+    migration.update_version_table(version=revision)
+
+
+def downgrade(migration):
+    migration.execute(
+        """
+        UPDATE todo t
+        SET position = subquery.new_position
+        FROM (
+            SELECT entity_id,
+                   ROW_NUMBER() OVER (PARTITION BY person_id ORDER BY position, created_on) - 1 as new_position
+            FROM todo
+            WHERE active = true
+        ) AS subquery
+        WHERE t.entity_id = subquery.entity_id
+        """
+    )
+    # Audited positions that no longer fit into an integer are dropped
+    migration.execute("UPDATE todo_audit SET position = 0 WHERE position NOT BETWEEN -2147483648 AND 2147483647")
+
+    migration.alter_column("todo", "position", "integer")
+    migration.alter_column("todo_audit", "position", "integer")
+
+    migration.update_version_table(version=down_revision)
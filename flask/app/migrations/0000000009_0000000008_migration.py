@@ -0,0 +1,30 @@
+from lib.indexes import create_index_concurrently, drop_index_concurrently
+
+revision = "0000000009"
+down_revision = "0000000008"
+
+
+def upgrade(migration):
+    # One index serving the todo list queries: they all filter on person_id and active todos and order by
+    # position, with entity_id as the tie breaker of the keyset pagination. It is built concurrently, and
+    # the indexes it replaces are only dropped once it is valid.
+    create_index_concurrently(
+        migration, "todo_person_id_position_ind",
+        "ON todo (person_id, position, entity_id) INCLUDE (is_completed) WHERE active = true"
+    )
+
+    drop_index_concurrently(migration, "todo_person_id_ind")
+    drop_index_concurrently(migration, "todo_is_completed_ind")
+    drop_index_concurrently(migration, "todo_position_ind")
+
+    migration.update_version_table(version=revision)
+
+
+def downgrade(migration):
+    create_index_concurrently(migration, "todo_person_id_ind", "ON todo (person_id)")
+    create_index_concurrently(migration, "todo_is_completed_ind", "ON todo (is_completed)")
+    create_index_concurrently(migration, "todo_position_ind", "ON todo (position)")
+
+    drop_index_concurrently(migration, "todo_person_id_position_ind")
+
+    migration.update_version_table(version=down_revision)
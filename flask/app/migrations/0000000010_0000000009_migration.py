@@ -0,0 +1,20 @@
+from lib.indexes import create_index_concurrently, drop_index_concurrently
+
+revision = "0000000010"
+down_revision = "0000000009"
+
+
+def upgrade(migration):
+    # Feed of changes of GET /todo/changes, deleted todos included. It is built concurrently, so writes to
+    # `todo` go on during the build.
+    create_index_concurrently(
+        migration, "todo_person_id_changed_on_ind", "ON todo (person_id, changed_on, entity_id)"
+    )
+
+    migration.update_version_table(version=revision)
+
+
+def downgrade(migration):
+    drop_index_concurrently(migration, "todo_person_id_changed_on_ind")
+
+    migration.update_version_table(version=down_revision)
@@ -0,0 +1,109 @@
+from datetime import date
+
+revision = "0000000011"
+down_revision = "0000000010"
+
+AUDIT_TABLES = [
+    "organization_audit",
+    "person_audit",
+    "email_audit",
+    "login_method_audit",
+    "person_organization_role_audit",
+    "todo_audit",
+]
+
+# Monthly partitions created past the current month; later ones are created by common/tasks/audit_maintenance.py
+PARTITIONS_AHEAD = 3
+
+
+def _add_months(month: date, months: int) -> date:
+    month_index = month.year * 12 + month.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _execute_in_transaction(migration, steps):
+    # migration.execute runs every statement on its own connection and rococo commits each of them, so the
+    # steps of a table swap are run on one cursor and committed once: a failure leaves the table untouched
+    adapter = migration.db_adapter
+    with adapter:
+        try:
+            steps(adapter._cursor)
+            adapter._connection.commit()
+        except Exception:
+            adapter._connection.rollback()
+            raise
+
+
+def _is_partitioned(migration, table):
+    rows = migration.execute(
+        "SELECT count(*) AS count FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", args=(table,)
+    )
+    return rows[0]["count"] > 0
+
+
+def _partition_table(cursor, table, current_month):
+    # Audit writes wait for the swap instead of landing in the table being copied
+    cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+    cursor.execute(f"SELECT min(changed_on)::date FROM {table}")
+    first_month = cursor.fetchone()[0]
+
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+    cursor.execute(f"ALTER TABLE {table}_old RENAME CONSTRAINT {table}_pkey TO {table}_old_pkey")
+
+    # The partition key has to be part of the primary key
+    cursor.execute(
+        f"CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS, "
+        f"CONSTRAINT {table}_pkey PRIMARY KEY (entity_id, version, changed_on)) PARTITION BY RANGE (changed_on)"
+    )
+    cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    month = (first_month or current_month).replace(day=1)
+    while month <= _add_months(current_month, PARTITIONS_AHEAD):
+        next_month = _add_months(month, 1)
+        cursor.execute(
+            f"CREATE TABLE {table}_{month:y%Ym%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+        month = next_month
+
+    # The partition key cannot be null: undated versions are kept in the default partition
+    cursor.execute(f"UPDATE {table}_old SET changed_on = 'epoch' WHERE changed_on IS NULL")
+    cursor.execute(f"INSERT INTO {table} SELECT * FROM {table}_old")
+    cursor.execute(f"DROP TABLE {table}_old CASCADE")
+
+
+def _unpartition_table(cursor, table):
+    cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_partitioned")
+    cursor.execute(f"ALTER TABLE {table}_partitioned RENAME CONSTRAINT {table}_pkey TO {table}_partitioned_pkey")
+    cursor.execute(
+        f"CREATE TABLE {table} (LIKE {table}_partitioned INCLUDING DEFAULTS, "
+        f"CONSTRAINT {table}_pkey PRIMARY KEY (entity_id, version))"
+    )
+    cursor.execute(f"INSERT INTO {table} SELECT * FROM {table}_partitioned ON CONFLICT DO NOTHING")
+    cursor.execute(f"DROP TABLE {table}_partitioned CASCADE")
+
+
+def upgrade(migration):
+    # Audit tables are range-partitioned by month of `changed_on`, so expired versions are dropped a partition
+    # at a time instead of being deleted row by row. Rows outside of every monthly partition go to the
+    # default partition.
+    #
+    # Every table is swapped in its own transaction, holding an exclusive lock on it, and tables already
+    # partitioned are skipped, so the migration can be run again after a failure. Audit writes block while
+    # their table is copied: run it with writes paused.
+    current_month = date.today().replace(day=1)
+
+    for table in AUDIT_TABLES:
+        if not _is_partitioned(migration, table):
+            _execute_in_transaction(migration, lambda cursor: _partition_table(cursor, table, current_month))
+
+    migration.update_version_table(version=revision)
+
+
+def downgrade(migration):
+    for table in AUDIT_TABLES:
+        if _is_partitioned(migration, table):
+            _execute_in_transaction(migration, lambda cursor: _unpartition_table(cursor, table))
+
+    migration.update_version_table(version=down_revision)
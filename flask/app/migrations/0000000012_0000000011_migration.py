@@ -0,0 +1,98 @@
+revision = "0000000012"
+down_revision = "0000000011"
+
+# Change of the counters of every row of a transition table, `sign` being 1 for new rows and -1 for old ones
+COUNTER_CHANGES = """
+    SELECT person_id,
+           {sign} * active::int AS total_count,
+           {sign} * (active AND NOT is_completed)::int AS active_count,
+           {sign} * (active AND is_completed)::int AS completed_count
+    FROM {rows}
+"""
+
+
+def _get_apply_changes_query(changes):
+    # Every statement bumps the revision of the people it touched, which versions their whole list
+    return f"""
+        INSERT INTO todo_counter AS counter (person_id, total_count, active_count, completed_count, revision)
+        SELECT person_id, sum(total_count), sum(active_count), sum(completed_count), 1
+        FROM ({changes}) AS changes
+        GROUP BY person_id
+        ORDER BY person_id
+        ON CONFLICT (person_id) DO UPDATE SET
+            total_count = counter.total_count + EXCLUDED.total_count,
+            active_count = counter.active_count + EXCLUDED.active_count,
+            completed_count = counter.completed_count + EXCLUDED.completed_count,
+            revision = counter.revision + 1;
+    """
+
+
+def upgrade(migration):
+    # Number of todos of every person, deleted todos excluded. The counters are maintained by statement-level
+    # triggers, in the transaction of every write to `todo`, and recomputed by common/tasks/todo_counters.py.
+    migration.create_table(
+        "todo_counter",
+        """
+            "person_id" varchar(32) NOT NULL,
+            "total_count" integer NOT NULL DEFAULT 0,
+            "active_count" integer NOT NULL DEFAULT 0,
+            "completed_count" integer NOT NULL DEFAULT 0,
+            "revision" bigint NOT NULL DEFAULT 0,
+            PRIMARY KEY ("person_id")
+        """
+    )
+
+    new_changes = COUNTER_CHANGES.format(sign=1, rows="new_todo")
+    old_changes = COUNTER_CHANGES.format(sign=-1, rows="old_todo")
+    migration.execute(
+        f"""
+        CREATE FUNCTION todo_counter_update() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {_get_apply_changes_query(new_changes)}
+            ELSIF TG_OP = 'UPDATE' THEN
+                {_get_apply_changes_query(f"{new_changes} UNION ALL {old_changes}")}
+            ELSE
+                {_get_apply_changes_query(old_changes)}
+            END IF;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+
+    # The triggers and the initial counts are committed together: the triggers lock `todo` against writes
+    # until the counts are stored
+    migration.execute(
+        """
+        CREATE TRIGGER todo_counter_insert_trg AFTER INSERT ON todo
+            REFERENCING NEW TABLE AS new_todo
+            FOR EACH STATEMENT EXECUTE FUNCTION todo_counter_update();
+        CREATE TRIGGER todo_counter_update_trg AFTER UPDATE ON todo
+            REFERENCING OLD TABLE AS old_todo NEW TABLE AS new_todo
+            FOR EACH STATEMENT EXECUTE FUNCTION todo_counter_update();
+        CREATE TRIGGER todo_counter_delete_trg AFTER DELETE ON todo
+            REFERENCING OLD TABLE AS old_todo
+            FOR EACH STATEMENT EXECUTE FUNCTION todo_counter_update();
+        INSERT INTO todo_counter (person_id, total_count, active_count, completed_count, revision)
+        SELECT person_id,
+               count(*) FILTER (WHERE active),
+               count(*) FILTER (WHERE active AND NOT is_completed),
+               count(*) FILTER (WHERE active AND is_completed),
+               1
+        FROM todo
+        GROUP BY person_id;
+        """
+    )
+
+    migration.update_version_table(version=revision)
+
+
+def downgrade(migration):
+    migration.execute("DROP TRIGGER IF EXISTS todo_counter_insert_trg ON todo")
+    migration.execute("DROP TRIGGER IF EXISTS todo_counter_update_trg ON todo")
+    migration.execute("DROP TRIGGER IF EXISTS todo_counter_delete_trg ON todo")
+    migration.execute("DROP FUNCTION IF EXISTS todo_counter_update()")
+    migration.drop_table("todo_counter")
+
+    migration.update_version_table(version=down_revision)
@@ -0,0 +1,26 @@
+from lib.indexes import create_index_concurrently, drop_index_concurrently
+
+revision = "0000000013"
+down_revision = "0000000012"
+
+
+def upgrade(migration):
+    # Both extensions are trusted, so the owner of the database can create them
+    migration.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    migration.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+
+    # Substring search of GET /todo/search: trigrams of the titles, scoped to a person through btree_gin.
+    # It is built concurrently, so writes to `todo` go on during the build.
+    create_index_concurrently(
+        migration, "todo_person_id_title_trgm_ind",
+        "ON todo USING gin (person_id, title gin_trgm_ops) WHERE active = true"
+    )
+
+    migration.update_version_table(version=revision)
+
+
+def downgrade(migration):
+    drop_index_concurrently(migration, "todo_person_id_title_trgm_ind")
+    # The extensions are left installed, other objects of the database may depend on them
+
+    migration.update_version_table(version=down_revision)
@@ -0,0 +1,39 @@
+"""
+Index builds that do not block writes to their table, for migrations. rococo puts the migrations directory on
+sys.path and skips this `lib` package, so migrations import it as `lib.indexes`.
+"""
+
+
+def execute_concurrently(migration, query):
+    # CREATE/DROP INDEX CONCURRENTLY cannot run in a transaction block, which psycopg2 opens for every
+    # statement unless the connection is in autocommit mode
+    adapter = migration.db_adapter
+    with adapter:
+        adapter._connection.autocommit = True
+        try:
+            adapter._cursor.execute(query)
+        finally:
+            adapter._connection.autocommit = False
+
+
+def is_index_valid(migration, index_name):
+    rows = migration.execute(
+        "SELECT indisvalid AS is_valid FROM pg_index WHERE indexrelid = to_regclass(%s)", args=(index_name,)
+    )
+    return bool(rows) and rows[0]["is_valid"]
+
+
+def create_index_concurrently(migration, index_name, definition):
+    """
+    Builds an index without blocking writes to its table, and checks it can be used. An invalid index left
+    by a failed build is dropped first, so the migration can be run again.
+    """
+    if not is_index_valid(migration, index_name):
+        drop_index_concurrently(migration, index_name)
+    execute_concurrently(migration, f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} {definition}")
+    if not is_index_valid(migration, index_name):
+        raise RuntimeError(f"Index {index_name} was not built")
+
+
+def drop_index_concurrently(migration, index_name):
+    execute_concurrently(migration, f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
@@ -2,7 +2,7 @@ from flask_restx import Namespace, Resource
 from flask import request
 from app.helpers.response import get_success_response, get_failure_response, parse_request_body, validate_required_fields
 from common.app_config import config
-from common.services import AuthService, PersonService
+from common.services import AuthService, PersonService, get_service
 
 # Create the auth blueprint
 auth_api = Namespace('auth', description="Auth related APIs")
@@ -31,7 +31,7 @@ class Signup(Resource):
         parsed_body = parse_request_body(request, ['first_name', 'last_name', 'email_address'])
         validate_required_fields(parsed_body)
 
-        auth_service = AuthService(config)
+        auth_service = get_service(AuthService, config)
 
         auth_service.signup(
             parsed_body['email_address'],
@@ -53,13 +53,13 @@ class Login(Resource):
         parsed_body = parse_request_body(request, ['email', 'password'])
         validate_required_fields(parsed_body)
 
-        auth_service = AuthService(config)
+        auth_service = get_service(AuthService, config)
         access_token, expiry = auth_service.login_user_by_email_password(
             parsed_body['email'], 
             parsed_body['password']
         )
 
-        person_service = PersonService(config)
+        person_service = get_service(PersonService, config)
         person = person_service.get_person_by_email_address(email_address=parsed_body['email'])
 
         return get_success_response(person=person.as_dict(), access_token=access_token, expiry=expiry)
@@ -76,7 +76,7 @@ class ForgotPassword(Resource):
         parsed_body = parse_request_body(request, ['email'])
         validate_required_fields(parsed_body)
 
-        auth_service = AuthService(config)
+        auth_service = get_service(AuthService, config)
         auth_service.trigger_forgot_password_email(parsed_body.get('email'))
 
         return get_success_response(message="Password reset email sent successfully.")
@@ -96,7 +96,7 @@ class ResetPassword(Resource):
         parsed_body = parse_request_body(request, ['password'])
         validate_required_fields(parsed_body)
 
-        auth_service = AuthService(config)
+        auth_service = get_service(AuthService, config)
         access_token, expiry, person_obj = auth_service.reset_user_password(token, uidb64, parsed_body.get('password'))
         return get_success_response(
             message="Your password has been updated!", 
@@ -1,20 +1,40 @@
 from flask_restx import Namespace, Resource
 from flask import request
-from app.helpers.response import get_success_response, parse_request_body, validate_required_fields
+from app.helpers.response import (
+    get_failure_response,
+    get_success_response,
+    get_not_modified_response,
+    is_not_modified,
+    make_etag,
+    parse_request_body,
+    validate_required_fields,
+)
 from app.helpers.decorators import login_required
 from common.services.person import PersonService
+from common.services.container import get_service
 from common.app_config import config
 
 # Create the organization blueprint
 person_api = Namespace('person', description="Person-related APIs")
 
 
+def _get_person_not_found_response():
+    # The access token is still valid, but the person it was issued to was deleted since
+    return get_failure_response(message="Person not found.", status_code=401)
+
+
 @person_api.route('/me')
 class Me(Resource):
     
     @login_required()
     def get(self, person):
-        return get_success_response(person=person)
+        person = person.resolve()
+        if person is None:
+            return _get_person_not_found_response()
+        etag = make_etag(person.version)
+        if is_not_modified(etag):
+            return get_not_modified_response(etag)
+        return get_success_response(person=person, etag=etag)
 
     @login_required()
     @person_api.expect(
@@ -38,8 +58,11 @@ class Me(Resource):
                 status_code=400
             )
 
-        person_service = PersonService(config)
-        
+        person_service = get_service(PersonService, config)
+        person = person.resolve()
+        if person is None:
+            return _get_person_not_found_response()
+
         # Update only the provided fields
         if "first_name" in parsed_body:
             person.first_name = parsed_body["first_name"]
@@ -3,20 +3,59 @@ from flask import request
 from app.helpers.response import (
     get_success_response,
     get_failure_response,
+    get_streaming_success_response,
+    get_not_modified_response,
+    is_not_modified,
+    make_etag,
     parse_request_body,
     validate_required_fields,
 )
 from app.helpers.decorators import login_required
+from app.helpers.exceptions import InputValidationError
 from common.app_config import config
 from common.services.todo import TodoListService
+from common.services.container import get_service
 
 todo_api = Namespace("todo", description="Todo List APIs")
 
+MAX_PAGE_SIZE = 200
+
+
+def _get_limit_arg():
+    """Parses the `limit` query argument, defaulting to MAX_PAGE_SIZE."""
+    limit = request.args.get("limit")
+    try:
+        limit = int(limit) if limit is not None else MAX_PAGE_SIZE
+    except ValueError:
+        raise InputValidationError("'limit' must be an integer.")
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise InputValidationError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}.")
+    return limit
+
+
+def _get_string_list_arg(parsed_body, name):
+    """Returns the `name` field of the body, which must be a list of strings."""
+    values = parsed_body[name]
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise InputValidationError(f"'{name}' must be a list of strings.")
+    return values
+
+
+def _get_version_arg(parsed_body=None):
+    """
+    Returns the version of the todo the client last saw, from the `version` field of the body or the
+    `If-Match` header. Without one, the todo is updated whatever its current version.
+    """
+    version = (parsed_body or {}).get("version")
+    if version is None:
+        version = next(iter(request.if_match), None)
+    return version
+
 
 class BaseTodoResource(Resource):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.todo_service = TodoListService(config)
+        self.todo_service = get_service(TodoListService, config)
 
 
 @todo_api.route("")
@@ -48,14 +87,123 @@ class Todos(BaseTodoResource):
     def get(self, person):
         """Get all todos with all, active, completed option."""
         filter_type = request.args.get("filter", "all")  
-        todos = self.todo_service.get_todo_list(person.entity_id, filter_type)
-        return get_success_response(todos=[todo.as_dict() for todo in todos])
+        limit = _get_limit_arg() if "limit" in request.args else None
+        cursor = request.args.get("cursor")
+
+        list_version = self.todo_service.get_todo_list_version(person.entity_id)
+        etag = make_etag(list_version, filter_type, limit, cursor)
+        if is_not_modified(etag):
+            return get_not_modified_response(etag)
+
+        if limit is None and cursor is None:
+            todos = self.todo_service.iter_todo_list(person.entity_id, filter_type, list_version)
+            return get_streaming_success_response("todos", (todo.as_dict() for todo in todos), etag=etag)
+
+        todos, next_cursor = self.todo_service.get_todo_page(
+            person.entity_id, filter_type, limit or MAX_PAGE_SIZE, cursor
+        )
+        return get_success_response(
+            todos=[todo.as_dict() for todo in todos], next_cursor=next_cursor, etag=etag
+        )
 
     @login_required()
     def delete(self, person):
         """Delete all completed tasks."""
-        self.todo_service.delete_completed_todo_list(person.entity_id)
-        return get_success_response(message="All completed tasks deleted successfully.")
+        deleted_count = self.todo_service.delete_completed_todo_list(person.entity_id)
+        return get_success_response(
+            deleted_count=deleted_count,
+            message="All completed tasks deleted successfully."
+        )
+
+
+@todo_api.route("/batch")
+class TodoBatch(BaseTodoResource):
+    """Endpoint for creating many todos at once."""
+
+    @login_required()
+    @todo_api.expect(
+        {
+            "type": "object",
+            "properties": {
+                "titles": {
+                    "type": "array",
+                    "items": {"type": "string"}
+                }
+            },
+            "required": ["titles"]
+        }
+    )
+    def post(self, person):
+        """Create tasks at the top of the list, in the order of the given titles."""
+        parsed_body = parse_request_body(request, ["titles"])
+        validate_required_fields(parsed_body)
+
+        todos = self.todo_service.create_todo_list_items(
+            person.entity_id, _get_string_list_arg(parsed_body, "titles")
+        )
+        return get_success_response(
+            todos=[todo.as_dict() for todo in todos],
+            message=f"{len(todos)} tasks created successfully."
+        )
+
+
+@todo_api.route("/changes")
+class TodoChanges(BaseTodoResource):
+    """Endpoint for syncing the todo list incrementally."""
+
+    @login_required()
+    def get(self, person):
+        """Get the tasks created, updated or deleted since the cursor of the previous call."""
+        todos, deleted_ids, next_cursor, has_more = self.todo_service.get_todo_changes(
+            person.entity_id, request.args.get("since"), _get_limit_arg()
+        )
+        return get_success_response(
+            todos=[todo.as_dict() for todo in todos],
+            deleted_ids=deleted_ids,
+            next_cursor=next_cursor,
+            has_more=has_more
+        )
+
+
+@todo_api.route("/search")
+class TodoSearch(BaseTodoResource):
+    """Endpoint for searching the todo list."""
+
+    @login_required()
+    def get(self, person):
+        """Get the tasks whose title contains `q`, the closest matches first."""
+        text = request.args.get("q")
+        limit = _get_limit_arg()
+        cursor = request.args.get("cursor")
+
+        etag = make_etag(self.todo_service.get_todo_list_version(person.entity_id), "search", text, limit, cursor)
+        if is_not_modified(etag):
+            return get_not_modified_response(etag)
+
+        todos, next_cursor = self.todo_service.search_todo_list(person.entity_id, text, limit, cursor)
+        return get_success_response(
+            todos=[todo.as_dict() for todo in todos], next_cursor=next_cursor, etag=etag
+        )
+
+
+@todo_api.route("/summary")
+class TodoSummary(BaseTodoResource):
+    """Endpoint for the count badges of the todo list."""
+
+    @login_required()
+    def get(self, person):
+        """Get the number of tasks, active tasks and completed tasks."""
+        summary = self.todo_service.get_todo_summary(person.entity_id)
+        etag = make_etag("summary", summary["revision"])
+        if is_not_modified(etag):
+            return get_not_modified_response(etag)
+
+        return get_success_response(
+            etag=etag,
+            total_count=summary["total_count"],
+            active_count=summary["active_count"],
+            completed_count=summary["completed_count"]
+        )
 
 
 @todo_api.route("/<string:entity_id>")
@@ -65,8 +213,10 @@ class TodoItem(BaseTodoResource):
     @login_required()
     def get(self, entity_id, person):
         """Get a todo."""
-        todo = self.todo_service.get_todo_list_item(entity_id)
-        return get_success_response(todo=todo.as_dict())
+        todo = self.todo_service.get_todo_list_item(person.entity_id, entity_id)
+        if todo is None:
+            return get_failure_response(message="Todo not found.", status_code=404)
+        return get_success_response(etag=todo.version, todo=todo.as_dict())
 
     @login_required()
     @todo_api.expect(
@@ -75,28 +225,32 @@ class TodoItem(BaseTodoResource):
             "properties": {
                 "title": {"type": "string"},
                 "is_completed": {"type": "boolean"},
+                "version": {"type": "string"},
             },
         }
     )
     def patch(self, entity_id, person):
-        """Update a task."""
-        parsed_body = parse_request_body(request, ["title", "is_completed"])
+        """Update a task. With a `version` or an `If-Match` header, a task changed since then is not updated."""
+        parsed_body = parse_request_body(request, ["title", "is_completed", "version"])
         validate_required_fields({"title": parsed_body["title"]})
 
         updated_todo = self.todo_service.update_todo_list_item(
+            person_id=person.entity_id,
             entity_id=entity_id,
             title=parsed_body["title"],
             is_completed=parsed_body["is_completed"],
+            version=_get_version_arg(parsed_body),
         )
         return get_success_response(
+            etag=updated_todo.version,
             todo=updated_todo.as_dict(), 
             message="Todo List updated successfully."
         )
 
     @login_required()
     def delete(self, entity_id, person):
-        """Delete a task."""
-        self.todo_service.delete_todo_list_item(entity_id)
+        """Delete a task. With an `If-Match` header, a task changed since then is not deleted."""
+        self.todo_service.delete_todo_list_item(person.entity_id, entity_id, version=_get_version_arg())
         return get_success_response(message="Todo List deleted successfully.")
 
 
@@ -106,14 +260,45 @@ class TodoStatus(BaseTodoResource):
 
     @login_required()
     def put(self, entity_id, person):
-        """Change the completion status of a task."""
-        updated_todo = self.todo_service.update_todo_list_item_status(entity_id)
+        """Change the completion status of a task. With an `If-Match` header, a changed task is not updated."""
+        updated_todo = self.todo_service.update_todo_list_item_status(
+            person.entity_id, entity_id, version=_get_version_arg()
+        )
         return get_success_response(
+            etag=updated_todo.version,
             todo=updated_todo.as_dict(),
             message=f"Todo marked as {'completed' if updated_todo.is_completed else 'active'}.",
         )
 
 
+@todo_api.route("/<string:entity_id>/position")
+class TodoPosition(BaseTodoResource):
+    """Endpoint for moving a single todo."""
+
+    @login_required()
+    @todo_api.expect(
+        {
+            "type": "object",
+            "properties": {
+                "after_id": {"type": "string", "nullable": True},
+            },
+        }
+    )
+    def put(self, entity_id, person):
+        """Move a task right after the task `after_id`, or to the top of the list when it is empty."""
+        parsed_body = parse_request_body(request, ["after_id"])
+
+        todo = self.todo_service.move_todo_list_item(
+            person_id=person.entity_id,
+            entity_id=entity_id,
+            after_id=parsed_body["after_id"] or None,
+        )
+        return get_success_response(
+            todo=todo.as_dict(),
+            message="Todo moved successfully."
+        )
+
+
 @todo_api.route("/mark-all")
 class MarkAllTodos(BaseTodoResource):
     """Endpoints for handling multiple todo operations at once."""
@@ -133,8 +318,9 @@ class MarkAllTodos(BaseTodoResource):
         parsed_body = parse_request_body(request, ["status"])
         validate_required_fields(parsed_body)
 
-        self.todo_service.mark_all_todo_list(person.entity_id, parsed_body["status"])
+        updated_count = self.todo_service.mark_all_todo_list(person.entity_id, parsed_body["status"])
         return get_success_response(
+            updated_count=updated_count,
             message=f"All todos marked as {parsed_body['status']}"
         )
 
@@ -161,15 +347,8 @@ class ReorderTodos(BaseTodoResource):
         parsed_body = parse_request_body(request, ["todo_ids"])
         validate_required_fields(parsed_body)
 
-        for position, todo_id in enumerate(parsed_body["todo_ids"]):
-            todo = self.todo_service.get_todo_list_item(todo_id)
-            if todo:
-                self.todo_service.update_todo_list_item(
-                    entity_id=todo_id,
-                    title=todo.title,
-                    is_completed=todo.is_completed,
-                    position=position
-                )
-
-        return get_success_response(message="Todos reordered successfully")
+        moved_count = self.todo_service.reorder_todo_list(
+            person.entity_id, _get_string_list_arg(parsed_body, "todo_ids")
+        )
+        return get_success_response(moved_count=moved_count, message="Todos reordered successfully")
 
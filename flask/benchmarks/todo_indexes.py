@@ -0,0 +1,132 @@
+"""
+Compares the query plans of the todo list queries with the single-column indexes of migration 0000000006
+and with the composite partial index of migration 0000000009.
+
+The benchmark seeds a scratch copy of the `todo` table, so it can run against any database the API uses:
+
+    cd flask && python -m benchmarks.todo_indexes --rows 2000000 --todos-per-person 2000
+"""
+import argparse
+import time
+
+import psycopg2
+
+from common.app_config import config
+
+TABLE = "todo_index_benchmark"
+
+OLD_INDEXES = [
+    f"CREATE INDEX {TABLE}_person_id_ind ON {TABLE} (person_id)",
+    f"CREATE INDEX {TABLE}_is_completed_ind ON {TABLE} (is_completed)",
+    f"CREATE INDEX {TABLE}_position_ind ON {TABLE} (position)",
+]
+
+NEW_INDEXES = [
+    f"CREATE INDEX {TABLE}_person_id_position_ind ON {TABLE} (person_id, position, entity_id) "
+    f"INCLUDE (is_completed) WHERE active = true",
+]
+
+QUERIES = {
+    "list page": (
+        f"SELECT * FROM {TABLE} WHERE person_id = %(person_id)s AND active = true "
+        f"ORDER BY position, entity_id LIMIT 50"
+    ),
+    "next page": (
+        f"SELECT * FROM {TABLE} WHERE person_id = %(person_id)s AND active = true "
+        f"AND (position, entity_id) > (%(position)s, '') ORDER BY position, entity_id LIMIT 50"
+    ),
+    "active filter": (
+        f"SELECT * FROM {TABLE} WHERE person_id = %(person_id)s AND active = true AND is_completed = false "
+        f"ORDER BY position, entity_id LIMIT 50"
+    ),
+    "top position": f"SELECT MIN(position) FROM {TABLE} WHERE person_id = %(person_id)s AND active = true",
+    "neighbour position": (
+        f"SELECT MIN(position) FROM {TABLE} WHERE person_id = %(person_id)s AND active = true "
+        f"AND position > %(position)s"
+    ),
+}
+
+
+def seed(cursor, rows, todos_per_person):
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cursor.execute(f"CREATE TABLE {TABLE} (LIKE todo INCLUDING DEFAULTS, PRIMARY KEY (entity_id))")
+    cursor.execute(
+        f"""
+        INSERT INTO {TABLE} (entity_id, version, person_id, title, is_completed, position, active)
+        SELECT md5(i::text), md5(random()::text), md5((i / %(per_person)s)::text), 'Todo ' || i,
+               random() < 0.5, (i %% %(per_person)s) * 1024, random() > 0.1
+        FROM generate_series(1, %(rows)s) AS i
+        """,
+        dict(rows=rows, per_person=todos_per_person)
+    )
+
+
+def create_indexes(cursor, create_statements):
+    cursor.execute(
+        "SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+        (TABLE, f"{TABLE}_pkey")
+    )
+    for (index_name,) in cursor.fetchall():
+        cursor.execute(f"DROP INDEX {index_name}")
+    for statement in create_statements:
+        cursor.execute(statement)
+    cursor.execute(f"ANALYZE {TABLE}")
+
+
+def time_inserts(cursor, count):
+    """Times inserting `count` todos, which pays the maintenance of every index of the table."""
+    started = time.perf_counter()
+    cursor.execute(
+        f"""
+        INSERT INTO {TABLE} (entity_id, version, person_id, title, position)
+        SELECT md5('insert' || i), md5(random()::text), md5('insert'), 'Inserted', i * 1024
+        FROM generate_series(1, %s) AS i
+        """,
+        (count,)
+    )
+    elapsed = time.perf_counter() - started
+    cursor.execute(f"DELETE FROM {TABLE} WHERE person_id = md5('insert')")
+    return elapsed
+
+
+def explain(cursor, params):
+    for name, query in QUERIES.items():
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {query}", params)
+        print(f"--- {name}")
+        for (line,) in cursor.fetchall():
+            print(f"    {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--todos-per-person", type=int, default=2000)
+    parser.add_argument("--inserts", type=int, default=10_000)
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {TABLE} table")
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(
+        host=config.POSTGRES_HOST, port=config.POSTGRES_PORT, user=config.POSTGRES_USER,
+        password=config.POSTGRES_PASSWORD, dbname=config.POSTGRES_DB
+    )
+    connection.autocommit = True
+    cursor = connection.cursor()
+    try:
+        print(f"Seeding {args.rows} todos, {args.todos_per_person} per person...")
+        seed(cursor, args.rows, args.todos_per_person)
+        cursor.execute("SELECT md5(%s::text)", (args.rows // args.todos_per_person // 2,))
+        params = dict(person_id=cursor.fetchone()[0], position=args.todos_per_person // 2 * 1024)
+
+        for title, create_statements in (("single-column indexes", OLD_INDEXES), ("composite index", NEW_INDEXES)):
+            create_indexes(cursor, create_statements)
+            print(f"\n=== {title}")
+            explain(cursor, params)
+            print(f"--- {args.inserts} inserts: {time_inserts(cursor, args.inserts):.3f}s")
+    finally:
+        if not args.keep:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
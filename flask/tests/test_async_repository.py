@@ -0,0 +1,89 @@
+"""
+Exercises the async repository layer against a real database. Set the POSTGRES_* variables of the app
+(e.g. with local.env) to run them; they are skipped otherwise.
+"""
+import asyncio
+import os
+from uuid import uuid4
+
+import pytest
+
+pytest.importorskip("psycopg_pool")
+
+from common.models.todo import Todo
+from common.repositories.async_adapter import AsyncPostgreSQLAdapter
+from common.repositories.routing import routing_scope
+from common.repositories.todo import AsyncTodoListRepository
+
+
+def _get_adapter(**kwargs):
+    if not os.environ.get("POSTGRES_HOST"):
+        pytest.skip("POSTGRES_HOST is not set")
+    return AsyncPostgreSQLAdapter(
+        os.environ["POSTGRES_HOST"], int(os.environ.get("POSTGRES_PORT", 5432)), os.environ["POSTGRES_USER"],
+        os.environ["POSTGRES_PASSWORD"], os.environ["POSTGRES_DB"], max_size=2, timeout=5, **kwargs
+    )
+
+
+def _run(test, **adapter_kwargs):
+    async def run():
+        adapter = _get_adapter(**adapter_kwargs)
+        try:
+            with routing_scope():
+                await test(AsyncTodoListRepository(adapter))
+        finally:
+            await adapter.close()
+
+    asyncio.run(run())
+
+
+async def _delete_person_todos(repository, person_id):
+    await repository.adapter.run_transaction([
+        ("DELETE FROM todo_audit WHERE person_id = %s", (person_id,)),
+        ("DELETE FROM todo WHERE person_id = %s", (person_id,)),
+    ])
+
+
+def test_saves_and_updates_todos_with_audit_rows():
+    async def test(repository):
+        person_id = uuid4().hex
+        try:
+            first = await repository.insert_at_top(Todo(person_id=person_id, title="first"))
+            second = await repository.insert_at_top(Todo(person_id=person_id, title="second"))
+
+            todos = await repository.get_page(person_id)
+            assert [todo.entity_id for todo in todos] == [second.entity_id, first.entity_id]
+
+            updated = await repository.update_fields(person_id, first.entity_id, {"title": "renamed"}, first.version)
+            assert updated.title == "renamed"
+            assert updated.previous_version == first.version
+            # The update is committed: a new connection of the pool sees it, and its audit row
+            assert (await repository.get_one({"entity_id": first.entity_id})).title == "renamed"
+            audit_rows = await repository.adapter.execute_query(
+                "SELECT version FROM todo_audit WHERE entity_id = %s", (first.entity_id,)
+            )
+            assert first.version in [row["version"] for row in audit_rows]
+
+            # A stale version matches no row
+            assert await repository.update_fields(person_id, first.entity_id, {"title": "stale"}, first.version) is None
+        finally:
+            await _delete_person_todos(repository, person_id)
+
+    _run(test)
+
+
+def test_reads_fall_back_to_the_primary_when_a_replica_is_unavailable():
+    async def test(repository):
+        person_id = uuid4().hex
+        try:
+            todo = await repository.insert_at_top(Todo(person_id=person_id, title="routed"))
+            # The write made every following read of the scope sticky to the primary
+            assert [todo.entity_id for todo in await repository.get_page(person_id)] == [todo.entity_id]
+
+            with routing_scope():
+                assert [found.entity_id for found in await repository.get_page(person_id)] == [todo.entity_id]
+        finally:
+            await _delete_person_todos(repository, person_id)
+
+    # Nothing listens on port 1, so every replica read has to be served by the primary
+    _run(test, replicas=({"host": "127.0.0.1", "port": 1},))
@@ -0,0 +1,56 @@
+from common.utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_set_is_ignored_after_an_invalidation_since_its_generation():
+    cache = TTLCache()
+    generation = cache.generation
+    cache.delete("other")
+
+    assert not cache.set("key", "stale", generation)
+    assert cache.get("key") is None
+
+    assert cache.set("key", "fresh", cache.generation)
+    assert cache.get("key") == "fresh"
+
+
+def test_clear_invalidates_every_generation():
+    cache = TTLCache()
+    generation = cache.generation
+    cache.set("key", "value")
+    cache.clear()
+
+    assert cache.get("key") is None
+    assert not cache.set("key", "value", generation)
+
+
+def test_entries_expire_after_their_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set("key", "value")
+
+    clock.now = 9.9
+    assert cache.get("key") == "value"
+    clock.now = 10
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_evicts_the_least_recently_used_entry():
+    cache = TTLCache(max_size=2)
+    cache.set("first", 1)
+    cache.set("second", 2)
+    cache.get("first")
+    cache.set("third", 3)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (2, 1, 1, 2)
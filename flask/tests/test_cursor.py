@@ -0,0 +1,25 @@
+import base64
+
+import pytest
+
+from common.utils.cursor import decode_cursor, encode_cursor
+
+
+def test_decodes_the_values_it_encoded():
+    cursor = encode_cursor(-1024, "entity", "2026-01-01 00:00:00.000001")
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 3) == [-1024, "entity", "2026-01-01 00:00:00.000001"]
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(1), encode_cursor(1, 2, 3)])
+def test_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+def test_rejects_cursors_that_are_not_lists():
+    cursor = base64.urlsafe_b64encode(b'{"a":1}').decode("ascii")
+
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 1)
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from app.helpers.identity import LazyModel
+
+
+def test_claims_are_read_without_loading_the_model():
+    loader_calls = []
+    person = LazyModel(lambda: loader_calls.append(1), entity_id="person")
+
+    assert person.entity_id == "person"
+    assert not loader_calls
+
+
+def test_the_model_is_loaded_once_for_other_attributes():
+    loader_calls = []
+
+    def load():
+        loader_calls.append(1)
+        return SimpleNamespace(entity_id="person", first_name="Ada")
+
+    person = LazyModel(load, entity_id="person")
+
+    assert person.first_name == "Ada"
+    assert person.resolve().first_name == "Ada"
+    assert len(loader_calls) == 1
+
+
+def test_setting_an_attribute_updates_the_model_and_its_claim():
+    model = SimpleNamespace(entity_id="person", first_name="Ada")
+    person = LazyModel(lambda: model, entity_id="person")
+
+    person.first_name = "Grace"
+    person.entity_id = "other"
+
+    assert model.first_name == "Grace"
+    assert person.entity_id == model.entity_id == "other"
+
+
+def test_resolve_returns_none_for_a_deleted_model():
+    person = LazyModel(lambda: None, entity_id="person")
+
+    assert person.resolve() is None
+    assert person.entity_id == "person"
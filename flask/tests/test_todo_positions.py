@@ -0,0 +1,35 @@
+"""
+Unit tests of the position arithmetic shared by the todo repositories.
+"""
+from common.repositories.todo import TodoQueriesMixin
+
+GAP = TodoQueriesMixin.POSITION_GAP
+
+
+def test_position_between_two_neighbours():
+    queries = TodoQueriesMixin()
+
+    assert queries._get_position_between() == 0
+    assert queries._get_position_between(following=0) == -GAP
+    assert queries._get_position_between(previous=0) == GAP
+    assert queries._get_position_between(0, GAP) == GAP // 2
+    assert queries._get_position_between(0, 2) == 1
+
+
+def test_no_position_between_adjacent_neighbours():
+    queries = TodoQueriesMixin()
+
+    assert queries._get_position_between(0, 1) is None
+    assert queries._get_position_between(5, 5) is None
+
+
+def test_reordered_todos_take_the_positions_they_hold():
+    positions = {"a": 0, "b": GAP, "c": 2 * GAP}
+
+    assert TodoQueriesMixin._get_reordered_positions(["c", "a", "b"], positions) == {"c": 0, "a": GAP, "b": 2 * GAP}
+    assert TodoQueriesMixin._get_reordered_positions(["a", "c", "b"], positions) == {"c": GAP, "b": 2 * GAP}
+    assert TodoQueriesMixin._get_reordered_positions(["a", "b", "c"], positions) == {}
+
+
+def test_reordering_todos_sharing_a_position_is_refused():
+    assert TodoQueriesMixin._get_reordered_positions(["a", "b"], {"a": 0, "b": 0}) is None
@@ -0,0 +1,76 @@
+"""
+Unit tests of the todo services, with their repository mocked out.
+"""
+import asyncio
+from unittest import mock
+
+import pytest
+
+from app.helpers.exceptions import InputValidationError
+from common.app_config import config
+from common.models.todo import Todo
+from common.services.todo import (
+    MAX_BATCH_SIZE, MAX_TITLE_LENGTH, AsyncTodoListService, TodoListService, _validate_titles
+)
+
+
+@pytest.fixture
+def service():
+    with mock.patch("common.services.todo.RepositoryFactory"):
+        service = TodoListService(config)
+    return service
+
+
+@pytest.fixture
+def async_service():
+    with mock.patch("common.services.todo.AsyncRepositoryFactory"):
+        service = AsyncTodoListService(config)
+    service.todo_repo = mock.AsyncMock()
+    return service
+
+
+def test_move_looks_the_todo_up_among_the_person_todos(service):
+    todo = Todo(person_id="person", title="todo")
+    service.todo_repo.get_one.return_value = todo
+    service.todo_repo.move.return_value = todo
+
+    assert service.move_todo_list_item("person", todo.entity_id, "other") is todo
+    service.todo_repo.get_one.assert_called_once_with({"entity_id": todo.entity_id, "person_id": "person"})
+    service.todo_repo.move.assert_called_once_with(todo, "other", changed_by_id="person")
+
+
+def test_move_rejects_a_todo_of_another_person(service):
+    service.todo_repo.get_one.return_value = None
+
+    with pytest.raises(InputValidationError):
+        service.move_todo_list_item("person", "todo")
+    service.todo_repo.move.assert_not_called()
+
+
+def test_move_rejects_a_todo_moved_after_itself(service):
+    service.todo_repo.get_one.return_value = Todo(person_id="person", title="todo")
+
+    with pytest.raises(InputValidationError):
+        service.move_todo_list_item("person", "todo", "todo")
+
+
+def test_async_move_looks_the_todo_up_among_the_person_todos(async_service):
+    todo = Todo(person_id="person", title="todo")
+    async_service.todo_repo.get_one.return_value = todo
+    async_service.todo_repo.move.return_value = todo
+
+    assert asyncio.run(async_service.move_todo_list_item("person", todo.entity_id)) is todo
+    async_service.todo_repo.get_one.assert_awaited_once_with({"entity_id": todo.entity_id, "person_id": "person"})
+    async_service.todo_repo.move.assert_awaited_once_with(todo, None, changed_by_id="person")
+
+
+def test_validate_titles_accepts_a_list_of_titles():
+    assert _validate_titles(["first", "x" * MAX_TITLE_LENGTH]) == ["first", "x" * MAX_TITLE_LENGTH]
+
+
+@pytest.mark.parametrize("titles", [
+    [], "title", None, ["title", " "], ["title", 1], ["x" * (MAX_TITLE_LENGTH + 1)], ["title"] * (MAX_BATCH_SIZE + 1)
+])
+def test_validate_titles_rejects_invalid_titles(titles):
+    with pytest.raises(InputValidationError):
+        _validate_titles(titles)